@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+
+import pygame
+
+import config
+
+# Build output (config.ATLAS_DIR):
+#   atlas@<scale>x.png  every nine-slice set packed into one image per DPI scale
+#   manifest.json       content hash, and per scale the image name and each
+#                       slice's sub-rect as "set/slice": [x, y, w, h]
+# Rebuilding is skipped while the hash of the sources and build settings is
+# unchanged, so the build step is cheap to run on every start.
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+SLICES = ("top_left", "top", "top_right", "left", "center", "right", "bottom_left", "bottom", "bottom_right")
+PART_KEYS = dict(zip(SLICES, ("tl", "t", "tr", "l", "c", "r", "bl", "b", "br")))
+PADDING = 1
+
+_manifest = None
+_parts = {}   # scale name -> {set: {part key: sub-surface}}
+_load_lock = threading.Lock()
+
+
+def scale_name(scale):
+    return f"{scale:g}"
+
+
+def source_hash(sets=config.ATLAS_SETS, scales=config.ATLAS_SCALES):
+    h = hashlib.sha256(json.dumps([MANIFEST_VERSION, PADDING, sets, list(scales)], sort_keys=True).encode())
+    for name in sorted(sets):
+        folder = sets[name][0]
+        for slice_name in SLICES:
+            h.update(slice_name.encode())
+            with open(os.path.join(folder, slice_name + ".png"), "rb") as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def _pack(sizes, max_width):
+    # Shelf packing, tallest first: returns key -> (x, y) and the atlas size
+    positions, x, y, shelf_h, width = {}, 0, 0, 0, 0
+    for key, (w, h) in sorted(sizes.items(), key=lambda kv: (-kv[1][1], kv[0])):
+        if x and x + w > max_width:
+            x, y, shelf_h = 0, y + shelf_h + PADDING, 0
+        positions[key] = (x, y)
+        x += w + PADDING
+        shelf_h = max(shelf_h, h)
+        width = max(width, x - PADDING)
+    return positions, (max(width, 1), max(y + shelf_h, 1))
+
+
+def _scaled_slices(sets, scale):
+    slices = {}
+    for name, (folder, base_scale) in sorted(sets.items()):
+        factor = base_scale * scale
+        for slice_name in SLICES:
+            image = pygame.image.load(os.path.join(folder, slice_name + ".png"))
+            w, h = image.get_size()
+            # Nearest-neighbour, like the pixel art itself
+            size = (max(1, int(w * factor)), max(1, int(h * factor)))
+            slices[f"{name}/{slice_name}"] = image if size == (w, h) else pygame.transform.scale(image, size)
+    return slices
+
+
+def build(out_dir=config.ATLAS_DIR, sets=config.ATLAS_SETS, scales=config.ATLAS_SCALES,
+          max_width=config.ATLAS_MAX_WIDTH, force=False):
+    digest = source_hash(sets, scales)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest = _read_manifest(manifest_path)
+    if not force and manifest is not None and manifest.get("hash") == digest and all(
+            os.path.exists(os.path.join(out_dir, entry["image"])) for entry in manifest["scales"].values()):
+        print(f"[Atlas] Up to date ({digest[:12]})")
+        return manifest
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {"version": MANIFEST_VERSION, "hash": digest, "sets": sorted(sets), "scales": {}}
+    for scale in scales:
+        slices = _scaled_slices(sets, scale)
+        positions, size = _pack({key: surf.get_size() for key, surf in slices.items()}, max_width)
+        atlas = pygame.Surface(size, pygame.SRCALPHA)
+        atlas.fill((0, 0, 0, 0))
+        rects = {}
+        for key, surf in slices.items():
+            atlas.blit(surf, positions[key])
+            rects[key] = [*positions[key], *surf.get_size()]
+        image_name = f"atlas@{scale_name(scale)}x.png"
+        pygame.image.save(atlas, os.path.join(out_dir, image_name))
+        manifest["scales"][scale_name(scale)] = {"image": image_name, "size": list(size), "rects": rects}
+        print(f"[Atlas] {image_name}: {len(rects)} slices in {size[0]}x{size[1]}")
+
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def _read_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == MANIFEST_VERSION else None
+
+
+def _nearest_scale(manifest, scale):
+    return min(manifest["scales"], key=lambda name: abs(float(name) - scale))
+
+
+def load(scale=1.0, out_dir=config.ATLAS_DIR):
+    # Nine-slice parts per set ({"tooltip": {"tl": surface, ...}, ...}) from
+    # the atlas closest to the requested scale. Each atlas image is read once
+    # per process; the parts are sub-surfaces sharing its pixels. Surfaces
+    # outlive pygame.quit(), so overlays shown again reuse them. The first
+    # call (re)builds the atlas if it is missing or out of date.
+    global _manifest
+    with _load_lock:
+        if _manifest is None:
+            _manifest = build(out_dir)
+
+        name = _nearest_scale(_manifest, scale)
+        parts = _parts.get(name)
+        if parts is None:
+            entry = _manifest["scales"][name]
+            atlas = pygame.image.load(os.path.join(out_dir, entry["image"]))
+            if pygame.display.get_surface() is not None:
+                atlas = atlas.convert_alpha()
+            parts = {}
+            for key, rect in entry["rects"].items():
+                set_name, slice_name = key.split("/")
+                parts.setdefault(set_name, {})[PART_KEYS[slice_name]] = atlas.subsurface(pygame.Rect(rect))
+            _parts[name] = parts
+            print(f"[Atlas] Loaded {entry['image']} for UI scale {scale:g}")
+        return parts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the overlay's nine-slice borders into DPI-scaled atlases")
+    parser.add_argument("--out", default=config.ATLAS_DIR, help="output directory")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the sources are unchanged")
+    args = parser.parse_args()
+    build(args.out, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+import config
+from metrics import span
+
+GOOGLE_SCOPES = ["https://www.googleapis.com/auth/cloud-translation"]
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TranslateRequestError(Exception):
+    def __init__(self, message, retryable):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def chunk_texts(texts, max_segments=config.TRANSLATE_MAX_SEGMENTS, max_chars=config.TRANSLATE_MAX_CHARS):
+    # Split into index chunks that respect the API's per-request segment and
+    # character limits. A single over-long string still gets its own chunk.
+    chunks, current, chars = [], [], 0
+    for i, text in enumerate(texts):
+        size = len(text)
+        if current and (len(current) >= max_segments or chars + size > max_chars):
+            chunks.append(current)
+            current, chars = [], 0
+        current.append(i)
+        chars += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class GoogleRestBackend:
+    # Google Translate v2 over plain HTTPS. The endpoint is configurable so a
+    # local mock server (mock_translate_server.py) can stand in for Google.
+    def __init__(self, endpoint=config.TRANSLATE_ENDPOINT, api_key=None):
+        self.endpoint = endpoint
+        self.api_key = api_key or os.getenv("GOOGLE_TRANSLATE_API_KEY")
+        self.credentials = None
+        self.credentials_lock = threading.Lock()
+
+    def _token(self):
+        # Service-account flow, same credentials the google-cloud client uses
+        with self.credentials_lock:
+            if self.credentials is None:
+                import google.auth
+                self.credentials, _ = google.auth.default(scopes=GOOGLE_SCOPES)
+            if not self.credentials.valid:
+                from google.auth.transport.requests import Request
+                self.credentials.refresh(Request())
+            return self.credentials.token
+
+    async def headers(self, loop):
+        if self.api_key or not self.endpoint.startswith("https://translation.googleapis.com"):
+            return {}
+        token = await loop.run_in_executor(None, self._token)
+        return {"Authorization": f"Bearer {token}"}
+
+    async def translate(self, session, texts, source_lang, target_lang):
+        body = {"q": texts, "source": source_lang, "target": target_lang}
+        params = {"key": self.api_key} if self.api_key else None
+        headers = await self.headers(asyncio.get_running_loop())
+        async with session.post(self.endpoint, json=body, params=params, headers=headers) as response:
+            if response.status != 200:
+                detail = (await response.text())[:200]
+                raise TranslateRequestError(f"HTTP {response.status}: {detail}", response.status in RETRYABLE_STATUS)
+            payload = await response.json()
+        translations = [t["translatedText"] for t in payload["data"]["translations"]]
+        if len(translations) != len(texts):
+            raise TranslateRequestError(f"Expected {len(texts)} translations, got {len(translations)}", False)
+        return translations
+
+
+class AsyncTranslator:
+    # Drop-in for google.cloud.translate_v2.Client.translate: callers stay
+    # synchronous, the chunks run concurrently on a private event loop over a
+    # pooled aiohttp session. Chunks that still fail after retries come back
+    # with translatedText None instead of failing the whole batch.
+    def __init__(self, backend=None, concurrency=config.TRANSLATE_CONCURRENCY,
+                 retries=config.TRANSLATE_RETRIES, backoff=config.TRANSLATE_BACKOFF,
+                 timeout=config.TRANSLATE_TIMEOUT):
+        self.backend = backend or GoogleRestBackend()
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = None
+        self.semaphore = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="translate-loop", daemon=True)
+        self.thread.start()
+
+    def translate(self, texts, source_language="ja", target_language="en"):
+        future = asyncio.run_coroutine_threadsafe(
+            self.translate_async(list(texts), source_language, target_language), self.loop)
+        return future.result()
+
+    async def _ensure_session(self):
+        if self.session is None:
+            import aiohttp
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        return self.session
+
+    async def translate_async(self, texts, source_lang, target_lang):
+        session = await self._ensure_session()
+        chunks = chunk_texts(texts)
+        results = await asyncio.gather(*(
+            self._translate_chunk(session, [texts[i] for i in chunk], source_lang, target_lang)
+            for chunk in chunks
+        ))
+
+        out = [None] * len(texts)
+        failed = 0
+        for chunk, translations in zip(chunks, results):
+            if translations is None:
+                failed += 1
+                translations = [None] * len(chunk)
+            for i, translation in zip(chunk, translations):
+                out[i] = {"translatedText": translation}
+        if failed:
+            print(f"[Translate] {failed}/{len(chunks)} chunks failed after retries")
+        return out
+
+    async def _translate_chunk(self, session, texts, source_lang, target_lang):
+        for attempt in range(self.retries + 1):
+            start = time.time()
+            try:
+                async with self.semaphore:
+                    with span("translate.chunk", items=len(texts), attempt=attempt):
+                        return await self.backend.translate(session, texts, source_lang, target_lang)
+            except Exception as e:
+                retryable = getattr(e, "retryable", True)
+                print(f"[Translate] Chunk of {len(texts)} failed after {time.time() - start:.2f}s "
+                      f"(attempt {attempt + 1}): {e}")
+                if not retryable or attempt == self.retries:
+                    return None
+                # Exponential backoff with jitter so retries don't arrive in lockstep
+                await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+        return None
+
+    def close(self):
+        async def _close():
+            if self.session is not None:
+                await self.session.close()
+        asyncio.run_coroutine_threadsafe(_close(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # Unix only; on Windows the report has no max RSS
+    resource = None
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import capture
+import config
+import translator
+from ocr import extract_japanese_text
+from frame_diff import FrameDiffer, bbox_in_regions
+from translation_cache import TranslationCache
+from translation_memory import TranslationMemory
+from layout import translate_blocks
+from metrics import percentile
+from profiles import get_profile, set_profile
+from text_render import GlyphAtlas
+
+STAGES = ["capture", "ocr", "translate", "layout"]
+
+
+class StubTranslateClient:
+    # Stands in for google.cloud.translate_v2.Client with a fixed round trip
+    # plus a per-character cost, so runs are repeatable and offline
+    def __init__(self, latency=0.15, per_char=0.0):
+        self.latency = latency
+        self.per_char = per_char
+        self.requests = 0
+        self.chars = 0
+
+    def translate(self, texts, source_language=None, target_language=None):
+        chars = sum(len(t) for t in texts)
+        self.requests += 1
+        self.chars += chars
+        time.sleep(self.latency + self.per_char * chars)
+        return [{'translatedText': f"[{target_language}] {t}"} for t in texts]
+
+
+def summarize(samples, peaks):
+    total = sum(samples)
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mean_ms": total / len(samples) * 1000 if samples else 0.0,
+        "throughput_per_s": len(samples) / total if total else 0.0,
+        "peak_mem_mb": max(peaks) / 2**20 if peaks else None,
+    }
+
+
+class LayoutBench:
+    # Runs the overlay's per-item geometry and text layout without opening a window
+    def __init__(self, geometry):
+        from overlay_pygame import OverlayWindow
+        pygame.init()
+        pygame.display.set_mode((1, 1))
+        self.overlay = OverlayWindow([], geometry)
+        self.overlay._load_parts()
+        self.font = GlyphAtlas("assets/fonts/PressStart2P-Regular.ttf", 18)
+        self.big_font = GlyphAtlas("assets/fonts/PressStart2P-Regular.ttf", 24)
+
+    def run(self, data):
+        self.overlay.update_data(data)
+        self.overlay._swap_scene()
+        for i, item in enumerate(data):
+            x, y, w, h = self.overlay.rect_index.rect(i)
+            self.overlay.hovered_index = i
+            tx = item.get("translation") or ""
+            self.overlay._get_smart_tooltip_position((x + w // 2, y + h // 2), tx, self.font)
+            self.overlay._wrap_text(self.big_font, tx, 380)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    set_profile(args.profile)
+    backend = capture.create_backend("file", source=args.corpus, loop=True)
+    capture.set_backend(backend)
+    stub = StubTranslateClient(args.latency, args.per_char)
+    translator.set_client(stub)
+    translator.translation_cache = TranslationCache(path=None, max_entries=args.cache_size)
+    translator.set_memory(TranslationMemory(path=None) if args.fuzzy_memory else None)
+
+    differ = FrameDiffer() if args.frame_diff else None
+    layout = LayoutBench(backend.monitor_geometry())
+    samples = {stage: [] for stage in STAGES}
+    peaks = {stage: [] for stage in STAGES}
+    last_data = []
+
+    def timed(stage, fn, *fn_args):
+        if args.memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = fn(*fn_args)
+        samples[stage].append(time.perf_counter() - start)
+        if args.memory:
+            peaks[stage].append(tracemalloc.get_traced_memory()[1])
+        return result
+
+    def ocr(image_np):
+        if differ is None:
+            return extract_japanese_text(image_np)
+        regions = differ.changed_regions(image_np, last_data)
+        if regions is None:
+            return extract_japanese_text(image_np)
+        kept = [d for d in last_data if not bbox_in_regions(d['bbox'], regions)]
+        return kept + (extract_japanese_text(image_np, regions) if regions else [])
+
+    def translate(data):
+        translate_blocks(data, translator.translate_batch)
+
+    if args.memory:
+        tracemalloc.start()
+
+    frames = args.frames or len(backend.images)
+    if not frames and backend.video is not None:
+        frames = int(backend.video.get(backend._cv2.CAP_PROP_FRAME_COUNT))
+    frames = frames or 1
+    for i in range(args.warmup + frames):
+        if i == args.warmup:
+            samples = {stage: [] for stage in STAGES}
+            peaks = {stage: [] for stage in STAGES}
+        image_np, _ = timed("capture", capture.capture_active_monitor)
+        data = timed("ocr", ocr, image_np)
+        last_data = data
+        timed("translate", translate, data)
+        timed("layout", layout.run, data)
+
+    if args.memory:
+        tracemalloc.stop()
+
+    end_to_end = [sum(parts) for parts in zip(*(samples[s] for s in STAGES))]
+    cache_stats = translator.translation_cache.stats()
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": sys.version.split()[0],
+        "corpus": args.corpus,
+        "frames": frames,
+        "settings": {
+            "latency": args.latency,
+            "per_char": args.per_char,
+            "cache_size": args.cache_size,
+            "fuzzy_memory": args.fuzzy_memory,
+            "frame_diff": args.frame_diff,
+            "ocr_mode": config.OCR_MODE,
+            "profile": args.profile,
+            "detect_scale": get_profile(args.profile)["detect_scale"],
+        },
+        "stages": {stage: summarize(samples[stage], peaks[stage]) for stage in STAGES},
+        "end_to_end": summarize(end_to_end, []),
+        "translate_requests": stub.requests,
+        "translate_chars": stub.chars,
+        "cache": cache_stats,
+        "memory": translator.get_memory().stats() if translator.get_memory() else None,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None,
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"\n{'stage':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per s':>10}{'peak MB':>10}")
+    rows = list(report["stages"].items()) + [("end_to_end", report["end_to_end"])]
+    for stage, s in rows:
+        peak = f"{s['peak_mem_mb']:.1f}" if s["peak_mem_mb"] is not None else "-"
+        line = f"{stage:<12}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['throughput_per_s']:>10.2f}{peak:>10}"
+        if baseline:
+            old = baseline["stages"].get(stage) or (baseline["end_to_end"] if stage == "end_to_end" else None)
+            if old and old["p50_ms"]:
+                line += f"   p50 {100 * (s['p50_ms'] / old['p50_ms'] - 1):+.1f}% vs {baseline.get('revision')}"
+        print(line)
+    print(f"translate: {report['translate_requests']} requests, {report['translate_chars']} chars, "
+          f"cache hit rate {report['cache']['hit_rate']:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded screenshots through capture -> OCR -> translate -> layout")
+    parser.add_argument("corpus", nargs="?", default=config.CAPTURE_SOURCE, help="image file, directory, glob or video")
+    parser.add_argument("--frames", type=int, default=0, help="frames to measure (default: one pass over the corpus)")
+    parser.add_argument("--warmup", type=int, default=1, help="unmeasured frames run first")
+    parser.add_argument("--latency", type=float, default=0.15, help="stub translate round trip in seconds")
+    parser.add_argument("--per-char", type=float, default=0.0, help="stub translate cost per character in seconds")
+    parser.add_argument("--cache-size", type=int, default=config.TRANSLATION_CACHE_MAX_ENTRIES, help="0 disables the cache")
+    parser.add_argument("--profile", default=config.PROFILE, choices=sorted(config.PROFILES), help="OCR profile")
+    parser.add_argument("--fuzzy-memory", action="store_true", help="reuse translations of near-duplicate lines")
+    parser.add_argument("--frame-diff", action="store_true", help="gate OCR with FrameDiffer")
+    parser.add_argument("--memory", action="store_true", help="track per-stage peak Python/NumPy memory (slower)")
+    parser.add_argument("--out", default="bench_results", help="directory for the JSON report")
+    parser.add_argument("--compare", help="previous JSON report to diff against")
+    args = parser.parse_args()
+
+    report = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    os.makedirs(args.out, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{report['revision'] or 'norev'}.json"
+    path = os.path.join(args.out, name)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[Bench] Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,406 @@
-import dxcam
+import glob
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import win32api
-from screeninfo import get_monitors
 
-camera = dxcam.create(output_idx=0)
+import config
 
-def get_monitor_geometry_from_mouse():
-    x, y = win32api.GetCursorPos()
-    for m in get_monitors():
-        if m.x <= x <= m.x + m.width and m.y <= y <= m.y + m.height:
-            return {'left': m.x, 'top': m.y, 'width': m.width, 'height': m.height}
-    # fallback
-    return {'left': 0, 'top': 0, 'width': 1920, 'height': 1080}
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".webm")
+MAX_BUFFER_RINGS = 16   # regions with their own mss buffer ring; the oldest is dropped beyond this
 
-def capture_active_monitor():
-    geometry = get_monitor_geometry_from_mouse()
+def get_cursor_pos():
+    # win32api only exists on Windows; headless/Linux runs fall back to the primary monitor
+    try:
+        import win32api
+    except ImportError:
+        return None
+    return win32api.GetCursorPos()
+
+def _geometry(m):
+    return {'left': m.x, 'top': m.y, 'width': m.width, 'height': m.height}
+
+def query_monitors():
+    # Primary first, then in the order the OS reports them
+    from screeninfo import get_monitors
+    monitors = get_monitors()
+    return [_geometry(m) for m in sorted(monitors, key=lambda m: not getattr(m, "is_primary", False))]
+
+def _layout_signature():
+    # Monitor count and virtual desktop bounds: a few cheap system metric
+    # reads that change whenever a monitor is added, removed, moved or resized
+    try:
+        import win32api
+    except ImportError:
+        return None
+    return tuple(win32api.GetSystemMetrics(i) for i in (76, 77, 78, 79, 80))  # SM_X/Y/CX/CYVIRTUALSCREEN, SM_CMONITORS
+
+
+class MonitorTopology:
+    # Cached monitor list. Re-queried only when the layout signature changes,
+    # or after ttl seconds where no signature is available (non-Windows).
+    def __init__(self, query=query_monitors, signature=_layout_signature, ttl=config.CAPTURE_TOPOLOGY_TTL):
+        self.query = query
+        self.signature = signature
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.cached = None
+        self.cached_signature = None
+        self.cached_at = 0.0
+
+    def invalidate(self):
+        with self.lock:
+            self.cached = None
+
+    def monitors(self):
+        signature = self.signature()
+        with self.lock:
+            if self.cached is not None:
+                if signature is not None and signature == self.cached_signature:
+                    return self.cached
+                if signature is None and time.time() - self.cached_at < self.ttl:
+                    return self.cached
+            monitors = self.query() or [dict(config.CAPTURE_FALLBACK_GEOMETRY)]
+            if self.cached is not None and monitors != self.cached:
+                print(f"[Capture] Monitor layout changed: {len(monitors)} monitor(s)")
+            self.cached, self.cached_signature, self.cached_at = monitors, signature, time.time()
+            return monitors
+
+
+def monitor_at(monitors, pos):
+    x, y = pos
+    for m in monitors:
+        if m['left'] <= x < m['left'] + m['width'] and m['top'] <= y < m['top'] + m['height']:
+            return m
+    return None
+
+def active_monitor(monitors, pos):
+    # Monitor under the cursor; the primary one if the cursor is unknown
+    # (headless) or off every monitor
+    found = monitor_at(monitors, pos) if pos is not None else None
+    return dict(found or monitors[0])
+
+_topology = MonitorTopology()
+
+def get_monitor_geometry_from_mouse(topology=None):
+    return active_monitor((topology or _topology).monitors(), get_cursor_pos())
+
+
+class CaptureBackend:
+    name = None
+    topology = _topology
+
+    def monitors(self):
+        return self.topology.monitors()
+
+    def cursor_pos(self):
+        return get_cursor_pos()
+
+    def monitor_geometry(self):
+        return active_monitor(self.monitors(), self.cursor_pos())
+
+    def grab(self, region):
+        # region is (left, top, right, bottom) in desktop coordinates, within
+        # one monitor. Returns an HxWx3 BGR or HxWx4 BGRA uint8 array (OpenCV
+        # channel order, which preprocessing and session encoding assume). It
+        # may be a view into a buffer the backend reuses, so consumers must
+        # not hold on to it indefinitely.
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class DxcamBackend(CaptureBackend):
+    name = "dxcam"
+
+    def __init__(self):
+        import dxcam
+        self._dxcam = dxcam
+        self.cameras = {}   # output index -> camera
+        self.origins = {}   # output's desktop (left, top) -> camera
+        self.lock = threading.Lock()
+        self._camera_at(self.monitors()[0])
+
+    def _open_outputs(self):
+        # Opens any output not open yet, then maps every camera by where its
+        # output sits on the desktop. DXGI and the OS monitor list don't
+        # promise the same order, so outputs are matched by position, not index.
+        for idx in range(len(self.monitors())):
+            if idx in self.cameras:
+                continue
+            try:
+                camera = self._dxcam.create(output_idx=idx, output_color="BGRA")
+            except Exception:
+                break   # no more outputs on this adapter
+            if camera is None:
+                break
+            self.cameras[idx] = camera
+        self.origins = {}
+        for camera in self.cameras.values():
+            output = camera._output   # dxcam keeps the DXGI output description here
+            output.update_desc()      # the output may have moved since it was opened
+            rect = output.desc.DesktopCoordinates
+            self.origins[(rect.left, rect.top)] = camera
+
+    def _camera_at(self, monitor):
+        key = (monitor['left'], monitor['top'])
+        with self.lock:
+            if key not in self.origins:
+                self._open_outputs()
+            camera = self.origins.get(key)
+        if camera is None:
+            raise RuntimeError(f"No dxcam output at {key}")
+        return camera
+
+    def grab(self, region):
+        # One camera per output, regions relative to it
+        left, top, right, bottom = region
+        monitors = self.monitors()
+        monitor = monitor_at(monitors, (left, top)) or monitors[0]
+        x, y = monitor['left'], monitor['top']
+        # dxcam already returns a fresh array per grab, no need to copy it again
+        return self._camera_at(monitor).grab(region=(left - x, top - y, right - x, bottom - y))
+
+    def close(self):
+        for camera in self.cameras.values():
+            camera.release()
+
+
+class MssBackend(CaptureBackend):
+    name = "mss"
+
+    def __init__(self, buffer_count=config.CAPTURE_BUFFER_COUNT):
+        import mss
+        self._mss = mss
+        self.buffer_count = buffer_count
+        # mss handles are not shareable between threads (X11 display connections)
+        self._local = threading.local()
+        # Buffer rings are keyed by region and shared by every capture thread:
+        # with CAPTURE_ALL_MONITORS any pool thread may grab any monitor, and
+        # two same-sized monitors must not draw from one ring
+        self._rings = {}
+        self._rings_lock = threading.Lock()
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = self._mss.mss()
+        return sct
+
+    def _buffer(self, region, shape):
+        # Next preallocated frame of the region's ring, so the frames queued
+        # in the pipeline aren't fresh frame-sized allocations
+        with self._rings_lock:
+            ring = self._rings.get(region)
+            if ring is None or ring[1][0].shape != shape:
+                if len(self._rings) >= MAX_BUFFER_RINGS:
+                    self._rings.pop(next(iter(self._rings)))
+                ring = self._rings[region] = [itertools.cycle(range(self.buffer_count)),
+                                              [np.empty(shape, dtype=np.uint8) for _ in range(self.buffer_count)]]
+            return ring[1][next(ring[0])]
+
+    def grab(self, region):
+        left, top, right, bottom = region
+        shot = self._sct().grab({'left': left, 'top': top, 'width': right - left, 'height': bottom - top})
+        # mss hands back a new BGRA bytearray each time; copy it into a reused buffer
+        frame = self._buffer(tuple(region), (shot.height, shot.width, 4))
+        np.copyto(frame, np.frombuffer(shot.raw, dtype=np.uint8).reshape(frame.shape))
+        return frame
+
+
+class FileBackend(CaptureBackend):
+    # Replays image files (a file, directory or glob) or a video as if it were
+    # a monitor at (0, 0). Frames are decoded into preallocated buffers and
+    # handed out as read-only views.
+    name = "file"
+
+    def __init__(self, source=config.CAPTURE_SOURCE, loop=True, buffer_count=config.CAPTURE_BUFFER_COUNT):
+        import cv2
+        self._cv2 = cv2
+        self.source = source
+        self.loop = loop
+        self.lock = threading.Lock()
+        self.video = None
+        self.images = []
+
+        if os.path.isfile(source) and source.lower().endswith(VIDEO_EXTENSIONS):
+            self.video = cv2.VideoCapture(source)
+            if not self.video.isOpened():
+                raise RuntimeError(f"Could not open video {source}")
+            width = int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            # Enough buffers that the frame being OCR'd and the one queued
+            # behind it are not overwritten by the next decode
+            self.buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(buffer_count)]
+            self._slots = itertools.cycle(range(buffer_count))
+        else:
+            paths = self._expand(source)
+            if not paths:
+                raise RuntimeError(f"No images found for {source}")
+            for path in paths:
+                image = cv2.imread(path, cv2.IMREAD_COLOR)
+                if image is None:
+                    print(f"[Capture] Skipping unreadable image {path}")
+                    continue
+                image.flags.writeable = False
+                self.images.append(image)
+            if not self.images:
+                raise RuntimeError(f"No readable images in {source}")
+            height, width = self.images[0].shape[:2]
+            self._order = itertools.cycle(range(len(self.images))) if loop else iter(range(len(self.images)))
+
+        self.current = None
+        self.geometry = {'left': 0, 'top': 0, 'width': width, 'height': height}
+
+    def _expand(self, source):
+        if os.path.isdir(source):
+            names = sorted(os.listdir(source))
+            return [os.path.join(source, n) for n in names if n.lower().endswith(IMAGE_EXTENSIONS)]
+        if os.path.isfile(source):
+            return [source]
+        return sorted(p for p in glob.glob(source) if p.lower().endswith(IMAGE_EXTENSIONS))
+
+    def monitors(self):
+        return [dict(self.geometry)]
+
+    def monitor_geometry(self):
+        return dict(self.geometry)
+
+    def _next_frame(self):
+        if self.video is None:
+            index = next(self._order, None)
+            return None if index is None else self.images[index]
+
+        buffer = self.buffers[next(self._slots)]
+        ok, frame = self.video.read(buffer)
+        if not ok and self.loop:
+            self.video.set(self._cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.video.read(buffer)
+        return frame if ok else None
+
+    def grab(self, region):
+        with self.lock:
+            frame = self._next_frame()
+        if frame is None:
+            return None
+        left, top, right, bottom = region
+        view = frame[top:bottom, left:right]
+        view.flags.writeable = False
+        return view
+
+    def close(self):
+        if self.video is not None:
+            self.video.release()
+
+
+class SyntheticBackend(CaptureBackend):
+    # A made-up monitor layout with a fixed frame per monitor, for running
+    # the multi-monitor path headless. Frames default to blank; the cursor
+    # and layout can be changed at any time (set_layout simulates hotplug).
+    name = "synthetic"
+
+    def __init__(self, layout=config.CAPTURE_SYNTHETIC_LAYOUT, frames=None, cursor=None):
+        self.cursor = cursor
+        self.topology = MonitorTopology(query=lambda: [dict(m) for m in self.layout], signature=lambda: self.version)
+        self.set_layout(layout, frames)
+
+    def set_layout(self, layout, frames=None):
+        self.layout = [dict(m) for m in layout]
+        if frames is None:
+            frames = [np.zeros((m['height'], m['width'], 3), dtype=np.uint8) for m in self.layout]
+        self.frames = frames
+        self.version = getattr(self, "version", 0) + 1
+
+    def cursor_pos(self):
+        return self.cursor
+
+    def grab(self, region):
+        left, top, right, bottom = region
+        monitor = monitor_at(self.layout, (left, top))
+        if monitor is None:
+            return None
+        frame = self.frames[self.layout.index(monitor)]
+        x, y = monitor['left'], monitor['top']
+        view = frame[top - y:bottom - y, left - x:right - x]
+        view.flags.writeable = False
+        return view
+
+
+BACKENDS = {
+    DxcamBackend.name: DxcamBackend,
+    MssBackend.name: MssBackend,
+    FileBackend.name: FileBackend,
+    SyntheticBackend.name: SyntheticBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def create_backend(name=None, **kwargs):
+    name = name or config.CAPTURE_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown capture backend '{name}' (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name](**kwargs)
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+                print(f"[Capture] Using {_backend.name} backend")
+    return _backend
+
+def set_backend(backend):
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+def capture_monitor(geometry, backend=None):
+    backend = backend or get_backend()
     region = (geometry['left'], geometry['top'],
               geometry['left'] + geometry['width'],
               geometry['top'] + geometry['height'])
 
-    frame = camera.grab(region=region)
+    frame = backend.grab(region)
     if frame is None:
         raise RuntimeError("Screen capture failed")
-    image_np = np.array(frame)
-    return image_np, geometry
+    return frame, geometry
+
+def capture_active_monitor(backend=None):
+    backend = backend or get_backend()
+    return capture_monitor(backend.monitor_geometry(), backend)
+
+_grab_pool = None
+_grab_pool_lock = threading.Lock()
+
+def _get_grab_pool():
+    global _grab_pool
+    if _grab_pool is None:
+        with _grab_pool_lock:
+            if _grab_pool is None:
+                _grab_pool = ThreadPoolExecutor(max_workers=config.CAPTURE_MAX_PARALLEL, thread_name_prefix="capture")
+    return _grab_pool
+
+def capture_all_monitors(backend=None):
+    # Grabs every monitor at once. Returns [(frame, geometry)], skipping
+    # monitors that failed unless all of them did.
+    backend = backend or get_backend()
+    monitors = backend.monitors()
+    if len(monitors) == 1:
+        return [capture_monitor(dict(monitors[0]), backend)]
+
+    futures = [_get_grab_pool().submit(capture_monitor, dict(m), backend) for m in monitors]
+    shots = []
+    for monitor, future in zip(monitors, futures):
+        try:
+            shots.append(future.result())
+        except Exception as e:
+            print(f"[Capture] Skipping monitor at ({monitor['left']}, {monitor['top']}): {e}")
+    if not shots:
+        raise RuntimeError("Screen capture failed on every monitor")
+    return shots
@@ -0,0 +1,146 @@
+import sys
+
+# Translation cache
+TRANSLATION_CACHE_PATH = "cache/translations.json"
+TRANSLATION_CACHE_MAX_ENTRIES = 5000
+
+# Fuzzy translation memory: reuse translations of near-identical OCR readings
+TRANSLATION_MEMORY_ENABLED = True
+TRANSLATION_MEMORY_PATH = "cache/memory.json"
+TRANSLATION_MEMORY_IMPORTS = []          # curated .json/.tsv/.csv memories merged in at startup
+TRANSLATION_MEMORY_THRESHOLD = 0.85      # min similarity (1 - edit distance / length) to reuse
+TRANSLATION_MEMORY_MIN_CHARS = 4         # shorter lines only ever match exactly
+TRANSLATION_MEMORY_MAX_ENTRIES = 20000
+TRANSLATION_MEMORY_CANDIDATES = 20       # n-gram candidates checked by edit distance per lookup
+TRANSLATION_MEMORY_SAVE_INTERVAL = 30    # seconds between background saves of the memory file (and on exit)
+
+# Frame-diff gating: only OCR the tiles that changed since the last refresh
+FRAME_DIFF_ENABLED = True
+FRAME_DIFF_TILE_SIZE = 64      # px
+FRAME_DIFF_STEP = 2            # sample every Nth pixel when comparing
+FRAME_DIFF_THRESHOLD = 24      # summed RGB delta that counts as a change
+FRAME_DIFF_FULL_RATIO = 0.6    # fall back to full-frame OCR above this dirty fraction
+
+# Continuous auto-refresh (F10)
+AUTO_REFRESH_INTERVAL = 0.5    # seconds between captures
+PIPELINE_QUEUE_SIZE = 1        # frames/results waiting per stage; older ones are dropped
+
+# OCR
+OCR_MODE = "roi"               # "roi" = downscaled detection + crop recognition, "full" = plain readtext
+OCR_DETECT_SCALE = 0.5         # detector input scale; recognition always uses native resolution
+OCR_ROI_MARGIN = 12            # px; boxes closer than this are grouped into one region
+OCR_RECOGNIZE_BATCH_SIZE = 8
+OCR_REJECT_CACHE_SIZE = 2000   # line hashes remembered as non-Japanese and skipped before recognition
+
+# Per-app profiles: each entry overrides PROFILE_DEFAULTS
+PROFILE = "default"
+PROFILE_DEFAULTS = {
+    # Preprocessing (grayscale is always on; everything below works in place on it)
+    "contrast": None,            # None, "normalize" (stretch to full range) or "clahe" (local contrast)
+    "clahe_clip": 2.0,
+    "threshold": False,          # adaptive binarization of the recognizer input (detection sees the grey image)
+    "threshold_block": 31,       # px, odd; neighbourhood for the adaptive threshold
+    "threshold_c": 10,
+    "detect_scale": OCR_DETECT_SCALE,
+    "small_text_height": 0,      # px; regions with lines shorter than this are upscaled before recognition (0 = off)
+    "upscale": 2.0,
+    # Japanese filter: keep lines with this many Japanese characters making up this share of the line
+    "jp_min_chars": 2,
+    "jp_min_ratio": 0.5,
+    "translate_backend": None,   # None = TRANSLATE_BACKEND
+}
+PROFILES = {
+    "default": {},
+    # Large, anti-aliased dialogue text on busy backgrounds
+    "visual_novel": {"contrast": "clahe", "detect_scale": 0.35},
+    # Small bitmap fonts on flat backgrounds
+    "pixel_game": {"contrast": "normalize", "threshold": True, "small_text_height": 18, "upscale": 3.0},
+    # Desktop apps and web pages: small, high-contrast text
+    "app_ui": {"detect_scale": 0.75, "small_text_height": 14, "jp_min_ratio": 0.6},
+}
+
+# Layout analysis: neighbouring lines are merged into blocks and translated together
+LAYOUT_MERGE_ENABLED = True
+LAYOUT_LINE_GAP = 0.8          # max gap between lines, as a fraction of the line height (column width if vertical)
+LAYOUT_SIZE_RATIO = 1.6        # lines whose heights differ more than this never merge
+LAYOUT_VERTICAL_ASPECT = 1.5   # boxes this much taller than wide are vertical text
+
+# Session recording: every published refresh (frame, boxes, translations) saved for replay
+SESSION_RECORD = False
+SESSION_DIR = "sessions"       # one timestamped sub-directory per run
+SESSION_FRAME_FORMAT = ".png"  # ".png" lossless, ".jpg"/".webp" much smaller
+SESSION_FRAME_QUALITY = 90     # jpg/webp only
+
+# Screen capture
+CAPTURE_BACKEND = "dxcam" if sys.platform == "win32" else "mss"   # "dxcam", "mss" or "file"
+CAPTURE_SOURCE = "recordings"  # file backend: image file, directory, glob or video
+CAPTURE_BUFFER_COUNT = 3       # reused frame buffers (file backend video, mss); keep >= PIPELINE_QUEUE_SIZE + 2
+CAPTURE_ALL_MONITORS = False   # capture and OCR every monitor at once, one overlay each; False = monitor under the cursor
+CAPTURE_MAX_PARALLEL = 4       # monitors grabbed / OCR'd concurrently
+CAPTURE_TOPOLOGY_TTL = 5.0     # seconds; monitor list re-query interval where layout changes can't be detected
+CAPTURE_FALLBACK_GEOMETRY = {'left': 0, 'top': 0, 'width': 1920, 'height': 1080}   # if no monitors are reported
+CAPTURE_SYNTHETIC_LAYOUT = [   # synthetic backend: headless stand-in for a multi-monitor desktop
+    {'left': 0, 'top': 0, 'width': 1920, 'height': 1080},
+    {'left': 1920, 'top': 0, 'width': 1280, 'height': 1024},
+]
+
+# Metrics / tracing
+METRICS_EXPORT_PATH = "metrics/traces.jsonl"   # one JSON trace per refresh; None to disable
+METRICS_SUMMARY_PATH = "metrics/summary.json"  # per-span latency histograms
+METRICS_SUMMARY_EVERY = 20                     # rewrite the summary every N refreshes
+METRICS_ENDPOINT = None                        # optional URL to POST each trace to
+METRICS_HISTOGRAM_SIZE = 1000                  # samples kept per span for percentiles
+METRICS_OVERLAY_PANEL = False                  # draw last refresh timings on the overlay
+
+# Translate backends: "google" (transport below) or "local" (offline, see LOCAL_*)
+TRANSLATE_BACKEND = "google"   # profiles can override with "translate_backend"
+TRANSLATE_FALLBACK = "local"   # answers when the backend errors or is slower than the timeout; None to disable
+TRANSLATE_FALLBACK_TIMEOUT = 1.5   # seconds
+
+# Local translation: quantized CTranslate2 model if configured, else a phrase dictionary
+LOCAL_MT_MODEL_DIR = None      # e.g. "models/opus-mt-ja-en" (needs ctranslate2 + sentencepiece)
+LOCAL_MT_COMPUTE_TYPE = "int8"
+LOCAL_MT_THREADS = 4
+LOCAL_MT_BATCH_SIZE = 32
+LOCAL_MT_BEAM_SIZE = 2
+LOCAL_DICTIONARY_PATHS = []    # .json/.tsv/.csv glossaries; translation memory entries are always included
+
+# Translation transport
+TRANSLATE_CLIENT = "async"     # "async" = chunked concurrent REST calls, "google" = google-cloud-translate client
+TRANSLATE_ENDPOINT = "https://translation.googleapis.com/language/translate/v2"
+TRANSLATE_MAX_SEGMENTS = 128   # v2 API limit on q entries per request
+TRANSLATE_MAX_CHARS = 5000     # recommended max characters per request
+TRANSLATE_CONCURRENCY = 4      # parallel requests / pooled connections
+TRANSLATE_RETRIES = 2          # per chunk, on 429/5xx/network errors
+TRANSLATE_BACKOFF = 0.5        # seconds, doubled per retry
+TRANSLATE_TIMEOUT = 10         # seconds per request
+
+# Overlay rendering
+OVERLAY_IDLE_WAIT_MS = 250     # max sleep between redraw checks when nothing is animating
+OVERLAY_MAX_DIRTY_RECTS = 8    # more than this and the dirty rects are merged into one
+OVERLAY_GRID_CELL = 64         # px; cell size of the hover/tooltip spatial grid
+TEXT_LAYOUT_CACHE_SIZE = 512   # measured strings / wrapped texts kept per font
+OVERLAY_UI_SCALE = None        # border scale; None = from the overlay window's DPI (1.0 off Windows)
+
+# Asset atlas: nine-slice border sets packed per DPI scale by asset_atlas.py
+ATLAS_DIR = "assets/atlas"
+ATLAS_SETS = {                 # set name -> (source folder, scale of the 1x variant)
+    "tooltip": ("assets/tooltip", 0.4),
+    "box_border": ("assets/box_border_small", 1.0),
+}
+ATLAS_SCALES = (1.0, 1.25, 1.5, 2.0)
+ATLAS_MAX_WIDTH = 1024         # px; atlas rows wrap at this width
+
+# Multi-process OCR (0 = OCR in-process on the calling thread)
+OCR_POOL_WORKERS = 0           # each worker loads its own Reader (~several hundred MB)
+OCR_POOL_TILE_GRID = (2, 2)    # cols, rows the frame is split into
+OCR_POOL_TILE_OVERLAP = 64     # px each tile extends into its neighbours
+OCR_POOL_MIN_TILE = 256        # px; regions smaller than this aren't split further
+OCR_POOL_DEDUPE_OVERLAP = 0.5  # drop a seam duplicate covering this much of the smaller box
+OCR_POOL_WARM_TIMEOUT = 300    # seconds to wait for every worker to load its Reader
+
+# Line tracking across refreshes
+TRACK_MIN_IOU = 0.3            # box overlap needed to consider two lines the same
+TRACK_MIN_SIMILARITY = 0.6     # text similarity (0-1) needed to match them
+TRACK_STABLE_IOU = 0.8         # above this the old box is kept so the overlay doesn't jitter
+TRACK_MAX_MISSED = 2           # refreshes a line may go undetected before its ID is dropped
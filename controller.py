@@ -1,47 +1,289 @@
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import keyboard
-from overlay_pygame import OverlayWindow
-from capture import capture_active_monitor
+from overlay_pygame import OverlayWindow, OverlayProcess
+from capture import capture_active_monitor, capture_all_monitors, set_backend
 from ocr import extract_japanese_text
 from translator import translate_batch
+from layout import translate_blocks
+from frame_diff import FrameDiffer, bbox_in_regions
+from pipeline import ContinuousPipeline
+from engines import EngineWarmup
+from tracker import TextTracker
+from session import SessionWriter, new_session_path
+from scheduler import RefreshScheduler, RefreshCancelled
+from metrics import tracer, span
+import config
+import ocr
+
+def screen_key(geometry):
+    return (geometry['left'], geometry['top'], geometry['width'], geometry['height'])
+
+
+class Screen:
+    # Per-monitor state: each monitor diffs against its own previous frame
+    # and tracks its own lines
+    def __init__(self, geometry):
+        self.geometry = geometry
+        self.key = screen_key(geometry)
+        self.frame_differ = FrameDiffer() if config.FRAME_DIFF_ENABLED else None
+        self.tracker = TextTracker()
+        self.last_data = []
+        self.overlay = None
+
 
 class Controller:
-    def __init__(self):
+    def __init__(self, capture_backend=None):
+        # capture_backend: any capture.CaptureBackend, e.g. a SyntheticBackend
+        # to run headless; otherwise config.CAPTURE_BACKEND on first use
+        if capture_backend is not None:
+            set_backend(capture_backend)
         self.overlay = None
+        self.engines = EngineWarmup()
+        self.engines.start()
+        self.screens = {}
+        self.screens_lock = threading.Lock()
+        self.ocr_executor = ThreadPoolExecutor(max_workers=config.CAPTURE_MAX_PARALLEL, thread_name_prefix="screen-ocr")
+        # The screen whose frame is being OCR'd on this thread, for ocr.line_cache
+        self.ocr_screen = threading.local()
+        self.session = SessionWriter(new_session_path()) if config.SESSION_RECORD else None
+        # (trace id, screen key) -> frame copy, held between OCR and publish for the session
+        self.held_frames = OrderedDict()
+        if config.OCR_MODE == "roi":
+            ocr.line_cache = self._line_cache
+        # Manual refreshes run on the scheduler's thread; the lock covers the
+        # overlay against the auto-refresh publish thread
+        self.scheduler = RefreshScheduler(self._refresh)
+        self.overlay_lock = threading.Lock()
+        self.pipeline = ContinuousPipeline(
+            self._capture,
+            self._extract_text,
+            self._translate,
+            self._publish,
+        )
         keyboard.add_hotkey("F8", self.launch_or_refresh_overlay)
         keyboard.add_hotkey("F9", self.hide_overlay)
-        print("F8 = Show/Refresh overlay | F9 = Hide overlay | Ctrl+C = Quit")
+        keyboard.add_hotkey("F10", self.toggle_auto_refresh)
+        print("F8 = Show/Refresh overlay | F9 = Hide overlay | F10 = Toggle auto-refresh | Ctrl+C = Quit")
+
+    # Stages pass lists, one entry per captured monitor: the monitor under the
+    # cursor, or every monitor with config.CAPTURE_ALL_MONITORS.
+
+    def _screen(self, geometry):
+        key = screen_key(geometry)
+        with self.screens_lock:
+            screen = self.screens.get(key)
+            if screen is None:
+                screen = self.screens[key] = Screen(dict(geometry))
+            return screen
+
+    def _prune_screens(self, screens):
+        # Monitors that went away (or changed resolution) take their state and overlay with them
+        keys = {screen.key for screen in screens}
+        with self.screens_lock:
+            gone = [screen for key, screen in self.screens.items() if key not in keys]
+            for screen in gone:
+                del self.screens[screen.key]
+        for screen in gone:
+            if screen.overlay is not None:
+                screen.overlay.close()
+
+    def _capture(self):
+        with span("capture") as attrs:
+            if config.CAPTURE_ALL_MONITORS:
+                shots = capture_all_monitors()
+            else:
+                shots = [capture_active_monitor()]
+            screens = [self._screen(geometry) for _, geometry in shots]
+            if config.CAPTURE_ALL_MONITORS:
+                self._prune_screens(screens)
+            attrs["size"] = ", ".join(f"{g['width']}x{g['height']}" for _, g in shots)
+            return [frame for frame, _ in shots], screens
+
+    def _extract_text(self, frames, screens):
+        # Monitors are OCR'd concurrently; returns [(screen, data)]
+        if len(frames) == 1:
+            return [(screens[0], self._extract_screen(frames[0], screens[0]))]
+        trace = tracer.current()
+
+        def extract(image_np, screen):
+            with tracer.activate(trace):
+                return screen, self._extract_screen(image_np, screen)
+
+        return list(self.ocr_executor.map(extract, frames, screens))
+
+    def _extract_screen(self, image_np, screen):
+        if self.session is not None:
+            self._hold_frame(image_np, screen)
+        with span("ocr") as attrs:
+            self.ocr_screen.screen = screen
+            try:
+                data = self._ocr(image_np, screen)
+            finally:
+                self.ocr_screen.screen = None
+            data = screen.tracker.update(data)
+            attrs["lines"] = len(data)
+            return data
+
+    def _line_cache(self, bounds, fingerprint):
+        screen = getattr(self.ocr_screen, "screen", None)
+        return screen.tracker.lookup(bounds, fingerprint) if screen is not None else None
+
+    def _ocr(self, image_np, screen):
+        if screen.frame_differ is None:
+            data = extract_japanese_text(image_np)
+            screen.last_data = data
+            return data
+
+        try:
+            with span("ocr.diff") as attrs:
+                regions = screen.frame_differ.changed_regions(image_np, screen.last_data)
+                attrs["regions"] = "full" if regions is None else len(regions)
+            if regions is None:
+                data = extract_japanese_text(image_np)
+            elif not regions:
+                print("[OCR] Screen unchanged, reusing previous results")
+                data = list(screen.last_data)
+            else:
+                # Keep results outside the changed regions, re-read only the rest
+                kept = [d for d in screen.last_data if not bbox_in_regions(d['bbox'], regions)]
+                data = kept + extract_japanese_text(image_np, regions)
+        except Exception:
+            screen.frame_differ.reset()
+            raise
+
+        screen.last_data = data
+        return data
+
+    def _translate(self, results):
+        # Lines are merged into blocks and translated a block at a time; blocks
+        # whose lines were reused unchanged already carry their translation.
+        # Each monitor is grouped on its own, its boxes are in its own coordinates.
+        for screen, data in results:
+            if not data:
+                continue
+            with span("translate", items=len(data)) as attrs:
+                attrs["segments"] = translate_blocks(data, translate_batch)
+            screen.tracker.remember_translations(data)
+
+    def _hold_frame(self, image_np, screen):
+        trace = tracer.current()
+        if trace is None:
+            return
+        self.held_frames[(trace.id, screen.key)] = SessionWriter.hold_frame(image_np)
+        # Frames whose refresh was dropped or failed never get published
+        while len(self.held_frames) > (config.PIPELINE_QUEUE_SIZE + 2) * max(1, len(self.screens)):
+            self.held_frames.popitem(last=False)
+
+    def _record(self, data, screen):
+        trace = tracer.current()
+        trace_id = trace.id if trace is not None else None
+        frame = self.held_frames.pop((trace_id, screen.key), None)
+        self.session.append(data, screen.geometry, frame, trace_id)
+
+    def _overlay_for(self, screen):
+        # pygame drives one window per process: in single-monitor mode one
+        # in-process overlay follows the active monitor, with every monitor
+        # captured each gets an overlay in its own process
+        if config.CAPTURE_ALL_MONITORS:
+            if screen.overlay is None:
+                screen.overlay = OverlayProcess([], screen.geometry)
+            return screen.overlay
+        if self.overlay is not None and self.overlay.geometry != screen.geometry:
+            self.overlay.hide()
+            self.overlay = None
+        if self.overlay is None:
+            self.overlay = OverlayWindow([], screen.geometry)
+        return self.overlay
+
+    def _publish(self, results, screens):
+        for screen, data in results:
+            if not data:
+                continue
+            if self.session is not None:
+                self._record(data, screen)
+            with self.overlay_lock, span("overlay", items=len(data)):
+                overlay = self._overlay_for(screen)
+                overlay.update_data(data)
+                overlay.show()
 
     def launch_or_refresh_overlay(self):
+        # Hotkey callback: queue the refresh and return straight away. A burst
+        # of presses collapses into one refresh, and a press during a refresh
+        # supersedes it.
+        if self.pipeline.running:
+            print("[Overlay] Auto-refresh is running, ignoring manual refresh")
+            return
+
         print("[Overlay] Launch requested...")
+        waiting = self.engines.pending()
+        if waiting:
+            print(f"[Overlay] Still loading: {', '.join(waiting)} (refresh will continue once ready)")
+        self.scheduler.request()
 
+    def _refresh(self, token):
         try:
-            # Step 1: Capture screen
-            image_np, geometry = capture_active_monitor()
+            with tracer.trace("refresh") as trace:
+                try:
+                    # Step 1: Capture screen(s)
+                    frames, screens = self._capture()
+                    token.check()
 
-            # Step 2: OCR
-            data = extract_japanese_text(image_np)
+                    # Step 2: OCR (only the regions that changed since last time)
+                    results = self._extract_text(frames, screens)
+                    token.check()
 
-            if not data:
-                print("[Overlay] No Japanese text found.")
-                return
-
-            # Step 3: Translate
-            translations = translate_batch([d['text'] for d in data])
-            for i, item in enumerate(data):
-                item['translation'] = translations[i]
-
-            # Step 4: Create or update overlay
-            if self.overlay is None:
-                self.overlay = OverlayWindow(data, geometry)
-                self.overlay.show()
-            else:
-                self.overlay.update_data(data)
-                self.overlay.show()
+                    if not any(data for _, data in results):
+                        print("[Overlay] No Japanese text found.")
+                        return
+
+                    # Step 3: Translate
+                    self._translate(results)
+
+                    # Step 4: Create or update overlays, unless a newer refresh is on its way
+                    token.check()
+                    self._publish(results, screens)
+                    print(f"[Overlay] Refresh #{trace.id} done in {time.time() - trace.started:.2f}s")
+                except RefreshCancelled:
+                    # Own trace name, like dropped auto-refresh frames, so it doesn't skew latency
+                    trace.name = "refresh.superseded"
+                    print(f"[Overlay] Refresh #{trace.id} superseded by a newer request")
 
         except Exception as e:
             print(f"[ERROR] Failed to launch/refresh overlay: {e}")
+            traceback.print_exc()
+
+    def toggle_auto_refresh(self):
+        if self.pipeline.running:
+            self.pipeline.stop()
+        else:
+            # A manual refresh still in OCR would share each screen's frame
+            # differ with the pipeline's OCR thread, so let it finish first
+            self.scheduler.cancel(wait=True)
+            self.pipeline.start()
+
+    def close(self):
+        self.scheduler.stop()
+        if self.pipeline.running:
+            self.pipeline.stop()
+        for screen in list(self.screens.values()):
+            if screen.overlay is not None:
+                screen.overlay.close()
+        self.ocr_executor.shutdown(wait=False)
+        if self.session is not None:
+            self.session.close()
 
     def hide_overlay(self):
-        if self.overlay:
-            print("[Overlay] Hiding overlay")
-            self.overlay.hide()
+        # Also stops a queued or running refresh from bringing the overlay back
+        self.scheduler.cancel()
+        if self.pipeline.running:
+            self.pipeline.stop()
+        overlays = [self.overlay] + [screen.overlay for screen in list(self.screens.values())]
+        overlays = [overlay for overlay in overlays if overlay is not None]
+        if overlays:
+            print("[Overlay] Hiding overlay" + ("s" if len(overlays) > 1 else ""))
+            for overlay in overlays:
+                overlay.hide()
@@ -0,0 +1,69 @@
+import threading
+import time
+
+from capture import get_backend
+from ocr import warm_ocr
+from translator import warm_translate
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+DEFAULT_LOADERS = {
+    "capture": get_backend,
+    "ocr": warm_ocr,
+    "translate": warm_translate,
+}
+
+
+class EngineWarmup:
+    # Loads the heavy engines on background threads so hotkeys work straight
+    # away. The getters are lock-guarded, so a refresh that arrives early just
+    # blocks on whatever is still loading.
+    def __init__(self, loaders=None):
+        self.loaders = dict(loaders or DEFAULT_LOADERS)
+        self.status = {name: PENDING for name in self.loaders}
+        self.errors = {}
+        self.events = {name: threading.Event() for name in self.loaders}
+        self.lock = threading.Lock()
+
+    def start(self):
+        for name, loader in self.loaders.items():
+            threading.Thread(target=self._load, args=(name, loader), name=f"warmup-{name}", daemon=True).start()
+
+    def _load(self, name, loader):
+        with self.lock:
+            self.status[name] = LOADING
+        start = time.time()
+        try:
+            loader()
+        except Exception as e:
+            with self.lock:
+                self.status[name] = FAILED
+                self.errors[name] = e
+            print(f"[Warmup] {name} failed to load: {e}")
+        else:
+            with self.lock:
+                self.status[name] = READY
+            print(f"[Warmup] {name} ready in {time.time() - start:.2f}s")
+        finally:
+            self.events[name].set()
+
+    def is_ready(self, name=None):
+        with self.lock:
+            if name is not None:
+                return self.status[name] == READY
+            return all(s == READY for s in self.status.values())
+
+    def pending(self):
+        with self.lock:
+            return [name for name, s in self.status.items() if s in (PENDING, LOADING)]
+
+    def wait(self, names=None, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        for name in names or self.loaders:
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            if not self.events[name].wait(remaining):
+                return False
+        return True
@@ -0,0 +1,124 @@
+import numpy as np
+
+import config
+
+
+def bbox_bounds(bbox):
+    xs = [pt[0] for pt in bbox]
+    ys = [pt[1] for pt in bbox]
+    return int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys))
+
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def bbox_in_regions(bbox, regions):
+    bounds = bbox_bounds(bbox)
+    return any(_overlaps(bounds, r) for r in regions)
+
+
+class FrameDiffer:
+    def __init__(self, tile_size=config.FRAME_DIFF_TILE_SIZE, step=config.FRAME_DIFF_STEP,
+                 threshold=config.FRAME_DIFF_THRESHOLD, full_ratio=config.FRAME_DIFF_FULL_RATIO):
+        self.tile_size = tile_size
+        self.step = step
+        self.threshold = threshold
+        self.full_ratio = full_ratio
+        self.prev_signature = None
+        self.prev_shape = None
+
+    def reset(self):
+        self.prev_signature = None
+        self.prev_shape = None
+
+    def _signature(self, frame):
+        # Subsampled sum of the colour channels; 3 * 255 still fits in int16
+        small = frame[::self.step, ::self.step, :3]
+        return small.sum(axis=2, dtype=np.int16)
+
+    def dirty_tiles(self, frame):
+        signature = self._signature(frame)
+        prev, prev_shape = self.prev_signature, self.prev_shape
+        self.prev_signature, self.prev_shape = signature, frame.shape
+        if prev is None or prev_shape != frame.shape:
+            return None
+
+        changed = np.abs(signature - prev) > self.threshold
+        cell = max(1, self.tile_size // self.step)
+        h, w = changed.shape
+        rows, cols = -(-h // cell), -(-w // cell)
+        padded = np.zeros((rows * cell, cols * cell), dtype=bool)
+        padded[:h, :w] = changed
+        return padded.reshape(rows, cell, cols, cell).any(axis=(1, 3))
+
+    def changed_regions(self, frame, previous_data):
+        # None = OCR the whole frame, [] = nothing changed, else (x0, y0, x1, y1) rects to re-OCR
+        tiles = self.dirty_tiles(frame)
+        if tiles is None:
+            return None
+        if not tiles.any():
+            return []
+        if tiles.mean() >= self.full_ratio:
+            return None
+
+        height, width = frame.shape[:2]
+        regions = [self._tiles_to_rect(component, width, height) for component in self._components(tiles)]
+        regions = self._grow_to_boxes(regions, [bbox_bounds(d["bbox"]) for d in previous_data])
+
+        area = sum((r[2] - r[0]) * (r[3] - r[1]) for r in regions)
+        if area >= self.full_ratio * width * height:
+            return None
+        return regions
+
+    def _components(self, tiles):
+        rows, cols = tiles.shape
+        seen = np.zeros_like(tiles)
+        for r, c in zip(*np.nonzero(tiles)):
+            if seen[r, c]:
+                continue
+            stack = [(r, c)]
+            seen[r, c] = True
+            component = []
+            while stack:
+                cr, cc = stack.pop()
+                component.append((cr, cc))
+                for nr in range(max(cr - 1, 0), min(cr + 2, rows)):
+                    for nc in range(max(cc - 1, 0), min(cc + 2, cols)):
+                        if tiles[nr, nc] and not seen[nr, nc]:
+                            seen[nr, nc] = True
+                            stack.append((nr, nc))
+            yield component
+
+    def _tiles_to_rect(self, component, width, height):
+        # Pad by one tile so text straddling a tile edge is recognised whole
+        rs = [int(r) for r, _ in component]
+        cs = [int(c) for _, c in component]
+        size = self.tile_size
+        return (max((min(cs) - 1) * size, 0), max((min(rs) - 1) * size, 0),
+                min((max(cs) + 2) * size, width), min((max(rs) + 2) * size, height))
+
+    def _grow_to_boxes(self, regions, boxes):
+        # Any previous box touching a dirty region is re-read in full, and
+        # regions that end up overlapping are merged
+        changed = True
+        while changed:
+            changed = False
+            for i, r in enumerate(regions):
+                for b in boxes:
+                    if _overlaps(r, b) and not (r[0] <= b[0] and r[1] <= b[1] and b[2] <= r[2] and b[3] <= r[3]):
+                        r = (min(r[0], b[0]), min(r[1], b[1]), max(r[2], b[2]), max(r[3], b[3]))
+                        changed = True
+                regions[i] = r
+
+            merged = []
+            for r in regions:
+                for j, m in enumerate(merged):
+                    if _overlaps(r, m):
+                        merged[j] = (min(r[0], m[0]), min(r[1], m[1]), max(r[2], m[2]), max(r[3], m[3]))
+                        changed = True
+                        break
+                else:
+                    merged.append(r)
+            regions = merged
+        return regions
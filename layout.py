@@ -0,0 +1,109 @@
+import config
+from frame_diff import bbox_bounds
+
+HORIZONTAL = "h"
+VERTICAL = "v"
+
+
+def orientation(bounds, text):
+    # Tall, narrow boxes holding more than one character are vertical lines
+    x0, y0, x1, y1 = bounds
+    if len(text) > 1 and (y1 - y0) > config.LAYOUT_VERTICAL_ASPECT * (x1 - x0):
+        return VERTICAL
+    return HORIZONTAL
+
+
+def _same_block(a, b, kind):
+    # a, b: (x0, y0, x1, y1). For horizontal text, b continues a if it sits
+    # just below it, at a similar size, overlapping it horizontally. Vertical
+    # text is the same rotated: the next column sits just to the left.
+    if kind == HORIZONTAL:
+        size_a, size_b = a[3] - a[1], b[3] - b[1]
+        gap = max(a[1], b[1]) - min(a[3], b[3])
+        overlap = min(a[2], b[2]) - max(a[0], b[0])
+    else:
+        size_a, size_b = a[2] - a[0], b[2] - b[0]
+        gap = max(a[0], b[0]) - min(a[2], b[2])
+        overlap = min(a[3], b[3]) - max(a[1], b[1])
+    size = min(size_a, size_b)
+    if size <= 0 or max(size_a, size_b) > config.LAYOUT_SIZE_RATIO * size:
+        return False
+    return gap <= config.LAYOUT_LINE_GAP * size and overlap > 0
+
+
+def _reading_key(bounds, kind):
+    # Horizontal: top to bottom, then left to right. Vertical: right to left, then top to bottom.
+    x0, y0, x1, y1 = bounds
+    return (y0, x0) if kind == HORIZONTAL else (-x1, y0)
+
+
+def union_groups(count, links):
+    # Union-find over indices 0..count-1: each linked (i, j) pair joins their
+    # groups. Returns the groups as index lists, ordered by first member.
+    parent = list(range(count))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in links:
+        parent[find(i)] = find(j)
+
+    groups = {}
+    for i in range(count):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def group_blocks(data):
+    # Groups neighbouring lines into blocks (dialogue boxes, paragraphs,
+    # vertical passages). Returns lists of indices into data, each block in
+    # reading order and the blocks ordered by their first line.
+    if not config.LAYOUT_MERGE_ENABLED:
+        return [[i] for i in range(len(data))]
+
+    bounds = [bbox_bounds(item["bbox"]) for item in data]
+    kinds = [orientation(b, item["text"]) for b, item in zip(bounds, data)]
+
+    def links():
+        order = sorted(range(len(data)), key=lambda i: bounds[i][1])
+        for n, i in enumerate(order):
+            for j in order[n + 1:]:
+                # Sorted by top edge: nothing further down can continue a horizontal line
+                if kinds[i] == HORIZONTAL and bounds[j][1] - bounds[i][3] > config.LAYOUT_LINE_GAP * (bounds[i][3] - bounds[i][1]):
+                    break
+                if kinds[i] == kinds[j] and _same_block(bounds[i], bounds[j], kinds[i]):
+                    yield i, j
+
+    groups = union_groups(len(data), links())
+    blocks = [sorted(members, key=lambda i: _reading_key(bounds[i], kinds[i])) for members in groups]
+    blocks.sort(key=lambda block: (bounds[block[0]][1], bounds[block[0]][0]))
+    return blocks
+
+
+def block_text(data, block):
+    # Japanese wraps without spaces, so lines join directly
+    return "".join(data[i]["text"] for i in block)
+
+
+def translate_blocks(data, translate):
+    # Translates each block that has an untranslated or regrouped line as one
+    # segment, then gives every member line the block's translation.
+    # translate: callable(list of texts) -> list of translations.
+    todo, texts = [], []
+    for block in group_blocks(data):
+        text = block_text(data, block)
+        members = [data[i] for i in block]
+        if any(m.get("translation") in (None, "[error]") or getattr(m.get("translation"), "provisional", False)
+               or m.get("block_text", m["text"]) != text for m in members):
+            todo.append(members)
+            texts.append(text)
+
+    translations = translate(texts) if texts else []
+    for members, text, translation in zip(todo, texts, translations):
+        for item in members:
+            item["translation"] = translation
+            item["block_text"] = text
+    return len(texts)
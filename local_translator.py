@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+
+import config
+from translation_cache import normalize_text
+from translation_memory import read_records
+
+
+def load_dictionary(paths):
+    # Same files translation_memory imports; languages are ignored
+    entries = {}
+    for path in paths:
+        try:
+            records = read_records(path)
+        except (OSError, ValueError) as e:
+            print(f"[Local] Could not load dictionary {path}: {e}")
+            continue
+        for record in records:
+            source = normalize_text(record.get("source"))
+            if source and record.get("translation"):
+                entries[source] = record["translation"]
+    return entries
+
+
+class DictionaryTranslator:
+    # Whole-line lookup, else greedy longest-match over known phrases. Rough,
+    # but instant, offline and deterministic. A line with any stretch no
+    # phrase covers gets None, so it shows as a failure rather than as its
+    # own untranslated source.
+    def __init__(self, entries=None, paths=config.LOCAL_DICTIONARY_PATHS):
+        self.entries = dict(load_dictionary(paths))
+        self.entries.update(entries or {})
+        self.longest = max((len(k) for k in self.entries), default=0)
+
+    def translate_text(self, text):
+        text = normalize_text(text)
+        if text in self.entries:
+            return self.entries[text]
+        pieces, i = [], 0
+        while i < len(text):
+            for size in range(min(self.longest, len(text) - i), 0, -1):
+                match = self.entries.get(text[i:i + size])
+                if match is not None:
+                    pieces.append(match)
+                    i += size
+                    break
+            else:
+                if not text[i].isspace():
+                    return None
+                i += 1
+        return " ".join(pieces) if pieces else None
+
+    def translate(self, texts, source_language="ja", target_language="en"):
+        return [{"translatedText": self.translate_text(t)} for t in texts]
+
+
+class CTranslate2Translator:
+    # Quantized MarianMT/NLLB-style model converted with ctranslate2, e.g.
+    #   ct2-transformers-converter --model Helsinki-NLP/opus-mt-ja-en --quantization int8
+    #       --copy_files source.spm target.spm --output_dir models/opus-mt-ja-en
+    # Loaded once and kept warm; each call is one batched translate_batch.
+    def __init__(self, model_dir=config.LOCAL_MT_MODEL_DIR, compute_type=config.LOCAL_MT_COMPUTE_TYPE,
+                 threads=config.LOCAL_MT_THREADS, batch_size=config.LOCAL_MT_BATCH_SIZE,
+                 beam_size=config.LOCAL_MT_BEAM_SIZE):
+        import ctranslate2
+        import sentencepiece
+        self.translator = ctranslate2.Translator(model_dir, device="cpu", compute_type=compute_type,
+                                                 intra_threads=threads)
+        self.source_sp = sentencepiece.SentencePieceProcessor(model_file=os.path.join(model_dir, "source.spm"))
+        self.target_sp = sentencepiece.SentencePieceProcessor(model_file=os.path.join(model_dir, "target.spm"))
+        self.batch_size = batch_size
+        self.beam_size = beam_size
+        self.lock = threading.Lock()
+
+    def translate(self, texts, source_language="ja", target_language="en"):
+        tokens = self.source_sp.encode([normalize_text(t) for t in texts], out_type=str)
+        with self.lock:
+            results = self.translator.translate_batch(tokens, max_batch_size=self.batch_size,
+                                                      beam_size=self.beam_size)
+        return [{"translatedText": self.target_sp.decode(r.hypotheses[0])} for r in results]
+
+
+class LocalTranslator:
+    # Offline backend: the local model when one is configured and loads,
+    # otherwise the dictionary. Lines the model leaves empty go through the
+    # dictionary too.
+    def __init__(self, dictionary_entries=None):
+        start = time.time()
+        self.dictionary = DictionaryTranslator(dictionary_entries)
+        self.model = None
+        if config.LOCAL_MT_MODEL_DIR:
+            try:
+                self.model = CTranslate2Translator()
+            except Exception as e:
+                print(f"[Local] Model unavailable ({e}), using the dictionary only")
+        engine = "model + dictionary" if self.model is not None else "dictionary"
+        print(f"[Local] {engine} ready in {time.time() - start:.2f}s "
+              f"({len(self.dictionary.entries)} dictionary entries)")
+
+    def translate(self, texts, source_language="ja", target_language="en"):
+        texts = list(texts)
+        if self.model is None:
+            return self.dictionary.translate(texts, source_language, target_language)
+        results = self.model.translate(texts, source_language, target_language)
+        for i, r in enumerate(results):
+            if not r["translatedText"]:
+                results[i] = {"translatedText": self.dictionary.translate_text(texts[i])}
+        return results
@@ -1,14 +1,17 @@
 import time
 from controller import Controller
+from metrics import tracer
 
 def main():
-    print("F8 = Show overlay | F9 = Close overlay | Ctrl+C = Quit")
+    print("F8 = Show overlay | F9 = Close overlay | F10 = Auto-refresh | Ctrl+C = Quit")
     controller = Controller()
 
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
+        controller.close()
+        tracer.export_summary()
         print("\n[App] Exiting cleanly.")
 
 if __name__ == "__main__":
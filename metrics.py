@@ -0,0 +1,211 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+import urllib.request
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import config
+
+
+def percentile(values, pct):
+    # Linear interpolation between the closest ranks
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class Histogram:
+    # Keeps the most recent samples for percentiles plus all-time count/total
+    def __init__(self, size):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": percentile(self.samples, 50) * 1000,
+            "p95_ms": percentile(self.samples, 95) * 1000,
+            "p99_ms": percentile(self.samples, 99) * 1000,
+        }
+
+
+class Trace:
+    def __init__(self, trace_id, name):
+        self.id = trace_id
+        self.name = name
+        self.started = time.time()
+        self.duration = None
+        self.spans = []
+        self.attrs = {}
+        self.error = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "started": self.started,
+            "duration_ms": None if self.duration is None else self.duration * 1000,
+            "attrs": self.attrs,
+            "error": self.error,
+            "spans": self.spans,
+        }
+
+
+class Tracer:
+    # One trace per refresh with timed spans for each stage. Spans attach to
+    # whichever trace is active on the current thread, so the pipeline can
+    # carry a trace across its worker threads.
+    def __init__(self, export_path=config.METRICS_EXPORT_PATH, summary_path=config.METRICS_SUMMARY_PATH,
+                 endpoint=config.METRICS_ENDPOINT, window=config.METRICS_HISTOGRAM_SIZE):
+        self.export_path = export_path
+        self.summary_path = summary_path
+        self.endpoint = endpoint
+        self.histograms = defaultdict(lambda: Histogram(window))
+        self.last_trace = None
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._outbox = None
+
+    def start_trace(self, name="refresh"):
+        return Trace(next(self._ids), name)
+
+    def finish_trace(self, trace):
+        trace.duration = time.time() - trace.started
+        with self.lock:
+            self.histograms[trace.name].add(trace.duration)
+            self.last_trace = trace
+            finished = self.histograms[trace.name].count
+        record = trace.to_dict()
+        if self.export_path:
+            self._append(record)
+        if self.endpoint:
+            self._post(record)
+        if self.summary_path and finished % config.METRICS_SUMMARY_EVERY == 0:
+            self.export_summary()
+
+    def current(self):
+        return getattr(self._local, "trace", None)
+
+    @contextmanager
+    def activate(self, trace):
+        previous = self.current()
+        self._local.trace = trace
+        try:
+            yield trace
+        finally:
+            self._local.trace = previous
+
+    @contextmanager
+    def trace(self, name="refresh"):
+        trace = self.start_trace(name)
+        with self.activate(trace):
+            try:
+                yield trace
+            except Exception as e:
+                trace.error = {"type": type(e).__name__, "message": str(e), "traceback": traceback.format_exc()}
+                raise
+            finally:
+                self.finish_trace(trace)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        # Callers may add to the yielded attrs dict (cache hits, request size...)
+        trace = self.current()
+        start = time.time()
+        error = None
+        try:
+            yield attrs
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            duration = time.time() - start
+            with self.lock:
+                self.histograms[name].add(duration)
+            if trace is not None:
+                entry = {"name": name, "offset_ms": (start - trace.started) * 1000,
+                         "duration_ms": duration * 1000, "thread": threading.current_thread().name}
+                if attrs:
+                    entry["attrs"] = attrs
+                if error:
+                    entry["error"] = error
+                trace.spans.append(entry)
+
+    def summary(self):
+        with self.lock:
+            return {name: h.summary() for name, h in sorted(self.histograms.items())}
+
+    def stats_lines(self):
+        # Short text for the on-overlay stats panel
+        trace = self.last_trace
+        if trace is None:
+            return []
+        lines = [f"#{trace.id} {trace.name} {trace.duration * 1000:.0f}ms"]
+        for span in trace.spans:
+            if "." not in span["name"]:
+                lines.append(f"{span['name']:<10}{span['duration_ms']:>7.0f}ms")
+        return lines
+
+    def export_summary(self, path=None):
+        path = path or self.summary_path
+        if not path:
+            return
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.summary(), f, indent=2)
+        except OSError as e:
+            print(f"[Metrics] Could not write {path}: {e}")
+
+    def _append(self, record):
+        folder = os.path.dirname(self.export_path)
+        try:
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with self.lock, open(self.export_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            print(f"[Metrics] Could not write {self.export_path}: {e}")
+
+    def _post(self, record):
+        # Sent from a background thread so a slow collector never stalls a refresh
+        if self._outbox is None:
+            self._outbox = queue.Queue(maxsize=256)
+            threading.Thread(target=self._sender, name="metrics-sender", daemon=True).start()
+        try:
+            self._outbox.put_nowait(record)
+        except queue.Full:
+            pass
+
+    def _sender(self):
+        while True:
+            record = self._outbox.get()
+            body = json.dumps(record, ensure_ascii=False, default=str).encode("utf-8")
+            request = urllib.request.Request(self.endpoint, data=body, headers={"Content-Type": "application/json"})
+            try:
+                urllib.request.urlopen(request, timeout=2).close()
+            except Exception as e:
+                print(f"[Metrics] Could not post trace {record['id']}: {e}")
+
+
+tracer = Tracer()
+span = tracer.span
@@ -0,0 +1,56 @@
+import argparse
+import asyncio
+import random
+
+from aiohttp import web
+
+# Local stand-in for the Google Translate v2 endpoint, for tests and benchmarks:
+#   python mock_translate_server.py --latency 0.2 --fail-rate 0.1
+# then set TRANSLATE_ENDPOINT = "http://127.0.0.1:8765/language/translate/v2"
+
+
+def make_app(latency=0.1, per_char=0.0, fail_rate=0.0):
+    stats = {"requests": 0, "segments": 0, "chars": 0, "failures": 0}
+
+    async def translate(request):
+        body = await request.json()
+        texts = body.get("q", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        chars = sum(len(t) for t in texts)
+        stats["requests"] += 1
+        stats["segments"] += len(texts)
+        stats["chars"] += chars
+        await asyncio.sleep(latency + per_char * chars)
+
+        if random.random() < fail_rate:
+            stats["failures"] += 1
+            return web.json_response({"error": {"code": 503, "message": "mock failure"}}, status=503)
+
+        target = body.get("target", "en")
+        return web.json_response({"data": {"translations": [
+            {"translatedText": f"[{target}] {t}"} for t in texts
+        ]}})
+
+    async def get_stats(request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_post("/language/translate/v2", translate)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Google Translate v2 server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per request")
+    parser.add_argument("--per-char", type=float, default=0.0, help="extra seconds per character")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+    web.run_app(make_app(args.latency, args.per_char, args.fail_rate), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,225 @@
-import easyocr
-import re
+import threading
 import time
+from collections import OrderedDict
 
-# Load once (takes ~2s at startup)
-reader = easyocr.Reader(['ja'], gpu=False)
+import config
+from layout import union_groups
+from metrics import span
+from profiles import get_profile
+from script_filter import japanese_mask
 
-def is_japanese(text):
-    if not text:
-        return False
+_reader = None
+_reader_lock = threading.Lock()
 
-    # Only keep if 60%+ of the characters are Japanese and 2+ characters are Japanese
-    jp_chars = re.findall(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff]', text)
-    ratio = len(jp_chars) / len(text) if len(text) > 0 else 0
-    return len(jp_chars) >= 2 and ratio >= 0.5
+# Optional recognition shortcut: callable((x0, y0, x1, y1), line_hash) -> (bbox, text, confidence) or None.
+# Lets the tracker answer for lines whose pixels haven't changed.
+line_cache = None
 
-def extract_japanese_text(image_np):
+# Hashes of lines that recognized as non-Japanese. An identical line is
+# skipped before recognition next time, so static English UI is only read once.
+_rejected_lines = OrderedDict()
+_rejected_lock = threading.Lock()
+
+def get_reader():
+    # Built on first use (takes ~2s), normally warmed in the background by engines.py
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                import easyocr
+                start = time.time()
+                _reader = easyocr.Reader(['ja'], gpu=False)
+                print(f"[OCR] Reader loaded in {time.time() - start:.2f}s")
+    return _reader
+
+def warm_ocr():
+    if config.OCR_POOL_WORKERS:
+        from ocr_pool import get_pool
+        return get_pool()
+    return get_reader()
+
+def is_japanese(text, profile=None):
+    profile = profile or get_profile()
+    return bool(japanese_mask([text], profile["jp_min_chars"], profile["jp_min_ratio"])[0])
+
+def _remember_rejected(hashes):
+    with _rejected_lock:
+        for h in hashes:
+            _rejected_lines[h] = None
+            _rejected_lines.move_to_end(h)
+        while len(_rejected_lines) > config.OCR_REJECT_CACHE_SIZE:
+            _rejected_lines.popitem(last=False)
+
+def _is_rejected(fingerprint):
+    with _rejected_lock:
+        return fingerprint in _rejected_lines
+
+def _group_rois(rects, margin):
+    # Union boxes whose margin-expanded rects touch into regions of interest
+    return union_groups(len(rects), (
+        (i, j) for i, a in enumerate(rects) for j, b in enumerate(rects[i + 1:], i + 1)
+        if (a[0] - margin < b[2] and b[0] - margin < a[2] and
+            a[1] - margin < b[3] and b[1] - margin < a[3])))
+
+def _box_bounds(kind, box, width, height):
+    if kind == 'h':
+        x0, x1, y0, y1 = box
+    else:
+        xs, ys = [p[0] for p in box], [p[1] for p in box]
+        x0, y0, x1, y1 = min(xs), min(ys), max(xs), max(ys)
+    return max(int(x0), 0), max(int(y0), 0), min(int(x1), width), min(int(y1), height)
+
+def _read_roi(image_np, origin=(0, 0), profile=None):
+    # Detection on a downscaled frame, then recognition of the detected boxes
+    # at native resolution (or upscaled, for small text), skipping known
+    # non-Japanese lines and lines the line cache already knows. Results carry
+    # a line hash as 4th element.
+    from tracker import line_hash
+    from preprocess import prepare, upscale
+
+    profile = profile or get_profile()
+    reader = get_reader()
+    with span("ocr.preprocess", profile=profile["name"]):
+        prepared = prepare(image_np, profile)
+    grey = prepared.grey
+    height, width = grey.shape[:2]
+
+    scale = prepared.detect_scale
+    with span("ocr.detect", scale=scale) as attrs:
+        horizontal, free = reader.detect(prepared.detect, min_size=max(1, int(20 * scale)), reformat=False)
+        attrs["boxes"] = len(horizontal[0]) + len(free[0])
+    horizontal = [[int(v / scale) for v in box] for box in horizontal[0]]
+    free = [[[int(x / scale), int(y / scale)] for x, y in poly] for poly in free[0]]
+
+    boxes = [('h', box) for box in horizontal] + [('f', poly) for poly in free]
+    if not boxes:
+        return []
+    rects = [_box_bounds(kind, box, width, height) for kind, box in boxes]
+
+    ox, oy = origin
+    results = []
+    # (crop, factor, box indices); the first batch is the whole frame at native size
+    batches = [((0, 0, width, height), 1, [])]
+    rois = _group_rois(rects, config.OCR_ROI_MARGIN)
+    rejected = 0
+    for members in rois:
+        x0 = min(rects[i][0] for i in members)
+        y0 = min(rects[i][1] for i in members)
+        x1 = max(rects[i][2] for i in members)
+        y1 = max(rects[i][3] for i in members)
+        todo = []
+        for i in members:
+            bounds = rects[i]
+            fingerprint = line_hash(grey, bounds)
+            if _is_rejected(fingerprint):
+                rejected += 1
+                continue
+            if line_cache is not None:
+                hit = line_cache((bounds[0] + ox, bounds[1] + oy, bounds[2] + ox, bounds[3] + oy), fingerprint)
+                if hit is not None:
+                    bbox, text, confidence = hit
+                    results.append(([[px - ox, py - oy] for px, py in bbox], text, confidence, fingerprint))
+                    continue
+            todo.append(i)
+        if not todo:
+            continue
+
+        heights = sorted(rects[i][3] - rects[i][1] for i in todo)
+        if profile["small_text_height"] and heights[len(heights) // 2] < profile["small_text_height"]:
+            batches.append(((x0, y0, x1, y1), profile["upscale"], todo))
+        else:
+            batches[0][2].extend(todo)
+
+    reused = len(results)
+    pending = sum(len(b[2]) for b in batches)
+    print(f"[OCR] {len(boxes)} boxes in {len(rois)} regions, {rejected} known non-Japanese lines skipped, {reused} unchanged lines reused, "
+          f"{len(batches) - 1} small-text regions upscaled")
+    if not pending:
+        return results
+
+    with span("ocr.recognize", boxes=pending, rejected=rejected, reused=reused,
+              upscaled=len(batches) - 1):
+        for (cx0, cy0, cx1, cy1), factor, indices in batches:
+            if not indices:
+                continue
+            keep_h = [boxes[i][1] for i in indices if boxes[i][0] == 'h']
+            keep_f = [boxes[i][1] for i in indices if boxes[i][0] == 'f']
+            image = grey
+            if factor != 1:
+                image = upscale(grey[cy0:cy1, cx0:cx1], factor)
+                keep_h = [[int((b[0] - cx0) * factor), int((b[1] - cx0) * factor),
+                           int((b[2] - cy0) * factor), int((b[3] - cy0) * factor)] for b in keep_h]
+                keep_f = [[[int((x - cx0) * factor), int((y - cy0) * factor)] for x, y in poly] for poly in keep_f]
+            recognized = reader.recognize(image, keep_h, keep_f, batch_size=config.OCR_RECOGNIZE_BATCH_SIZE,
+                                          reformat=False)
+
+            # One result per box, horizontal boxes first; report them in frame
+            # coordinates with the detected box so upscaling doesn't round them
+            order = [i for i in indices if boxes[i][0] == 'h'] + [i for i in indices if boxes[i][0] == 'f']
+            for i, (bbox, text, confidence) in zip(order, recognized):
+                kind, box = boxes[i]
+                if factor != 1:
+                    if kind == 'h':
+                        bbox = [[box[0], box[2]], [box[1], box[2]], [box[1], box[3]], [box[0], box[3]]]
+                    else:
+                        bbox = box
+                results.append((bbox, text, confidence, line_hash(grey, rects[i])))
+    return results
+
+def _read(image_np, origin=(0, 0), profile=None):
+    profile = profile or get_profile()
+    if config.OCR_MODE == "roi":
+        return _read_roi(image_np, origin, profile)
+    from preprocess import prepare
+    with span("ocr.preprocess", profile=profile["name"]):
+        grey = prepare(image_np, profile, detect=False).grey
+    with span("ocr.readtext"):
+        return get_reader().readtext(grey)
+
+def _read_regions(image_np, regions):
+    # Run OCR on each (x0, y0, x1, y1) crop and shift the boxes back into frame coordinates
+    height, width = image_np.shape[:2]
+    results = []
+    for x0, y0, x1, y1 in regions:
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, width), min(y1, height)
+        if x1 <= x0 or y1 <= y0:
+            continue
+        for bbox, text, confidence, *rest in _read(image_np[y0:y1, x0:x1], (x0, y0)):
+            bbox = [[int(px) + x0, int(py) + y0] for px, py in bbox]
+            results.append((bbox, text, confidence, *rest))
+    return results
+
+def extract_japanese_text(image_np, regions=None):
     start = time.time()
-    results = reader.readtext(image_np)
+    if config.OCR_POOL_WORKERS:
+        from ocr_pool import get_pool
+        results = get_pool().readtext(image_np, regions)
+    elif regions is None:
+        results = _read(image_np)
+    else:
+        results = _read_regions(image_np, regions)
+        print(f"[OCR] Re-reading {len(regions)} changed regions")
     print(f"[OCR] Found {len(results)} total results")
 
-    filtered = []
-    for bbox, text, confidence in results:
-        if is_japanese(text):
-            filtered.append({
-                'bbox': bbox,
-                'text': text,
-                'confidence': confidence,
-                'translation': None
-            })
+    profile = get_profile()
+    with span("ocr.filter", results=len(results)) as attrs:
+        keep = japanese_mask([r[1] for r in results], profile["jp_min_chars"], profile["jp_min_ratio"])
+        filtered, rejected = [], []
+        for (bbox, text, confidence, *rest), japanese in zip(results, keep):
+            fingerprint = rest[0] if rest else None
+            if japanese:
+                filtered.append({
+                    'bbox': bbox,
+                    'text': text,
+                    'confidence': confidence,
+                    'translation': None,
+                    'line_hash': fingerprint
+                })
+            elif fingerprint is not None:
+                rejected.append(fingerprint)
+        _remember_rejected(rejected)
+        attrs["kept"] = len(filtered)
 
     print(f"[OCR] Filtered {len(filtered)} Japanese entries")
     print(f"[OCR] Done in {time.time() - start:.2f}s")
@@ -0,0 +1,218 @@
+import atexit
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import config
+from frame_diff import bbox_bounds
+from metrics import span
+from profiles import active_profile, get_profile
+
+
+def make_tiles(width, height, cols, rows, overlap, origin=(0, 0)):
+    # (x0, y0, x1, y1) tiles covering the area, each grown by `overlap` px into
+    # its neighbours so a line cut by one seam is whole in the other tile
+    ox, oy = origin
+    tiles = []
+    for r in range(rows):
+        for c in range(cols):
+            x0 = ox + width * c // cols
+            x1 = ox + width * (c + 1) // cols
+            y0 = oy + height * r // rows
+            y1 = oy + height * (r + 1) // rows
+            tiles.append((max(x0 - overlap, ox), max(y0 - overlap, oy),
+                          min(x1 + overlap, ox + width), min(y1 + overlap, oy + height)))
+    return tiles
+
+
+def merge_tile_results(tile_results, frame_tiles, margin=2):
+    # Lines inside a tile overlap are read twice, and the copy that touches an
+    # inner tile edge is usually cut off. Prefer uncut, larger, more confident
+    # boxes and drop anything mostly covered by one already kept.
+    candidates = []
+    for tile, results in zip(frame_tiles, tile_results):
+        tx0, ty0, tx1, ty1 = tile
+        for bbox, text, confidence in results:
+            x0, y0, x1, y1 = bbox_bounds(bbox)
+            clipped = ((x0 - tx0 <= margin and tx0 > frame_tiles.left) or
+                       (y0 - ty0 <= margin and ty0 > frame_tiles.top) or
+                       (tx1 - x1 <= margin and tx1 < frame_tiles.right) or
+                       (ty1 - y1 <= margin and ty1 < frame_tiles.bottom))
+            area = max(x1 - x0, 1) * max(y1 - y0, 1)
+            candidates.append((not clipped, area, confidence, (x0, y0, x1, y1), (bbox, text, confidence)))
+
+    candidates.sort(key=lambda c: c[:3], reverse=True)
+    kept = []
+    for _, area, _, box, result in candidates:
+        duplicate = False
+        for _, other_area, _, other, _ in kept:
+            iw = min(box[2], other[2]) - max(box[0], other[0])
+            ih = min(box[3], other[3]) - max(box[1], other[1])
+            if iw > 0 and ih > 0 and iw * ih > config.OCR_POOL_DEDUPE_OVERLAP * min(area, other_area):
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append((None, area, None, box, result))
+
+    # Back to reading order
+    kept.sort(key=lambda k: (k[3][1], k[3][0]))
+    return [k[4] for k in kept]
+
+
+class _TileSet(list):
+    # Tiles plus the outer bounds they were cut from (for seam detection)
+    def __init__(self, tiles, bounds):
+        super().__init__(tiles)
+        self.left, self.top, self.right, self.bottom = bounds
+
+
+# --- worker process side -----------------------------------------------------
+
+_worker_shm = None
+_warm_barrier = None
+
+
+def _init_worker(torch_threads, barrier):
+    global _warm_barrier
+    _warm_barrier = barrier
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    import ocr
+    ocr.get_reader()
+
+
+def _attach(name):
+    global _worker_shm
+    if _worker_shm is not None and _worker_shm.name == name:
+        return _worker_shm
+    if _worker_shm is not None:
+        _worker_shm.close()
+    # The parent owns the segment. Spawned workers share its resource tracker,
+    # so attaching here doesn't add a second owner.
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        shm = shared_memory.SharedMemory(name=name)
+    _worker_shm = shm
+    return shm
+
+
+def _ocr_tile(shm_name, shape, dtype, tile, profile_name):
+    import ocr
+    shm = _attach(shm_name)
+    frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    x0, y0, x1, y1 = tile
+    results = []
+    # The profile travels with the task since set_profile() only ran in the parent
+    for bbox, text, confidence, *_ in ocr._read(frame[y0:y1, x0:x1], (x0, y0), get_profile(profile_name)):
+        bbox = [[int(px) + x0, int(py) + y0] for px, py in bbox]
+        results.append((bbox, text, float(confidence)))
+    del frame
+    return results
+
+
+def _ping():
+    # Blocks until every worker holds one ping, so warm() only returns once
+    # all of them have started and loaded their Reader
+    _warm_barrier.wait(timeout=config.OCR_POOL_WARM_TIMEOUT)
+    return os.getpid()
+
+
+# --- parent side ---------------------------------------------------------------
+
+class OCRPool:
+    # Worker processes each holding a warm easyocr Reader. A frame is copied
+    # once into shared memory and the workers read their tiles straight out
+    # of it, so nothing frame-sized is pickled.
+    def __init__(self, workers=config.OCR_POOL_WORKERS):
+        self.workers = workers
+        torch_threads = max(1, (os.cpu_count() or 1) // workers)
+        context = multiprocessing.get_context("spawn")
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(torch_threads, context.Barrier(workers)),
+        )
+        self.shm = None
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def warm(self):
+        # Returns once every worker has finished loading its Reader
+        start = time.time()
+        pids = set(f.result() for f in [self.executor.submit(_ping) for _ in range(self.workers)])
+        print(f"[OCR] {len(pids)} pool workers ready in {time.time() - start:.2f}s")
+
+    def _publish(self, image_np):
+        if self.shm is None or self.shm.size < image_np.nbytes:
+            if self.shm is not None:
+                self.shm.close()
+                self.shm.unlink()
+            self.shm = shared_memory.SharedMemory(create=True, size=image_np.nbytes)
+        view = np.ndarray(image_np.shape, dtype=image_np.dtype, buffer=self.shm.buf)
+        np.copyto(view, image_np)
+        del view
+
+    def _tiles(self, width, height, origin=(0, 0)):
+        cols, rows = config.OCR_POOL_TILE_GRID
+        # Small regions aren't worth splitting
+        cols = max(1, min(cols, width // config.OCR_POOL_MIN_TILE))
+        rows = max(1, min(rows, height // config.OCR_POOL_MIN_TILE))
+        return make_tiles(width, height, cols, rows, config.OCR_POOL_TILE_OVERLAP, origin)
+
+    def readtext(self, image_np, regions=None):
+        height, width = image_np.shape[:2]
+        with self.lock, span("ocr.pool", workers=self.workers) as attrs:
+            self._publish(image_np)
+            if regions is None:
+                groups = [_TileSet(self._tiles(width, height), (0, 0, width, height))]
+            else:
+                groups = []
+                for x0, y0, x1, y1 in regions:
+                    x0, y0 = max(x0, 0), max(y0, 0)
+                    x1, y1 = min(x1, width), min(y1, height)
+                    if x1 > x0 and y1 > y0:
+                        groups.append(_TileSet(self._tiles(x1 - x0, y1 - y0, (x0, y0)), (x0, y0, x1, y1)))
+
+            profile_name = active_profile()
+            futures = [[self.executor.submit(_ocr_tile, self.shm.name, image_np.shape, image_np.dtype.str, tile,
+                                             profile_name)
+                        for tile in tiles] for tiles in groups]
+            results = []
+            for tiles, tile_futures in zip(groups, futures):
+                results.extend(merge_tile_results([f.result() for f in tile_futures], tiles))
+            attrs["tiles"] = sum(len(t) for t in groups)
+        print(f"[OCR] Pool read {sum(len(t) for t in groups)} tiles on {self.workers} workers")
+        return results
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OCRPool()
+                _pool.warm()
+    return _pool
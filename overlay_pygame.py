@@ -1,110 +1,254 @@
+import ctypes
+import multiprocessing
 import pygame
-import win32gui
-import win32con
-import win32api
+import queue
 import threading
-import time
-import os
+from types import MappingProxyType
+
+import asset_atlas
+import config
+from metrics import tracer
+from spatial_index import RectIndex, bboxes_to_rects
+from text_render import GlyphAtlas
+
+try:
+    import win32gui
+    import win32con
+    import win32api
+except ImportError:
+    # Headless/Linux (benchmarks, replay): layout works, window styling is skipped
+    win32gui = win32con = win32api = None
+
+class Scene:
+    # Immutable snapshot of what the overlay shows. Built on the publishing
+    # thread (items copied, box index precomputed) and swapped in whole by
+    # the render thread, which never sees a half-updated list.
+    __slots__ = ("version", "items", "rect_index")
+
+    def __init__(self, version, items):
+        self.version = version
+        self.items = tuple(MappingProxyType(dict(item)) for item in items)
+        self.rect_index = RectIndex(bboxes_to_rects([item["bbox"] for item in self.items]))
+
 
 class OverlayWindow:
     def __init__(self, text_data, geometry):
-        self.text_data = text_data
         self.geometry = geometry
-        self.running = False
         self.thread = None
+        self.stop_event = threading.Event()
+        self.scene_lock = threading.Lock()
+        # Back buffer: latest published scene. The render thread's front
+        # buffer is self.scene; it swaps when the version changes.
+        self.published = Scene(1, text_data)
+        self.scene = None
         self.hwnd = None
         self.hovered_item = None
+        self.hovered_index = None
         self.clicked_item = None
+        self.items = []
+        self.rect_index = RectIndex([])
         self.tooltip_parts = None
         self.box_parts = None
         self.tooltip_alpha = 0
         self.tooltip_target_alpha = 255
         self.tooltip_pos = (0, 0)
         self.tooltip_text = ""
-
+        # Pre-rendered boxes/tooltips/text, keyed on (kind, size or text, style).
+        # Each entry remembers the data version it was last drawn in; entries
+        # not drawn during the previous version are pruned on the next update,
+        # so surfaces for lines that survive a refresh are kept.
+        self.surface_cache = {}
+        self.cache_version = -1
+        # Metrics panel source; an overlay in a child process shows its parent's
+        self.stats_lines = tracer.stats_lines
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive() and not self.stop_event.is_set()
+
+    @property
+    def text_data(self):
+        return list(self.published.items)
 
     def show(self):
-        if not self.running:
-            self.running = True
-            self.thread = threading.Thread(target=self._run_overlay, daemon=True)
-            self.thread.start()
-        else:
-            self.update_data(self.text_data)
+        if self.running:
+            self._wake()
+            return
+        if self.thread is not None and self.thread is not threading.current_thread():
+            # A previous hide() may still be tearing the window down
+            self.thread.join()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run_overlay, name="overlay", daemon=True)
+        self.thread.start()
 
     def hide(self):
-        self.running = False
-        time.sleep(0.1)
+        self.stop_event.set()
+        self._wake()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
 
     def update_data(self, new_text_data):
-        self.text_data = new_text_data
-        self.hovered_item = None
-        self.clicked_item = None
+        # Safe from any thread: build the next scene off the render thread,
+        # then publish it with a single reference swap
+        with self.scene_lock:
+            self.published = Scene(self.published.version + 1, new_text_data)
+        self._wake()
 
     def _run_overlay(self):
         pygame.init()
         width, height = self.geometry["width"], self.geometry["height"]
         screen = pygame.display.set_mode((width, height), pygame.NOFRAME)
-        hwnd = pygame.display.get_wm_info()["window"]
+        hwnd = pygame.display.get_wm_info().get("window")
         self.hwnd = hwnd
 
-        self._make_window_transparent(hwnd)
-        self._set_clickable(True)
+        if win32gui is not None:
+            self._make_window_transparent(hwnd)
+            self._set_clickable(True)
 
-        font = pygame.font.Font("assets/fonts/PressStart2P-Regular.ttf", 18)
-        big_font = pygame.font.Font("assets/fonts/PressStart2P-Regular.ttf", 24)
+        # Glyph atlases live as long as this pygame session; show() after
+        # hide() re-inits pygame and builds fresh ones
+        font = GlyphAtlas("assets/fonts/PressStart2P-Regular.ttf", 18)
+        big_font = GlyphAtlas("assets/fonts/PressStart2P-Regular.ttf", 24)
+        small_font = GlyphAtlas("assets/fonts/PressStart2P-Regular.ttf", 10)
         clock = pygame.time.Clock()
 
-        self._load_tooltip_parts()
-        self._load_box_parts()
+        self._load_parts()
+
+        screen_rect = screen.get_rect()
+        layers = {}
+        full_redraw = True
+        animating = False
+
+        while not self.stop_event.is_set():
+            if self.published is not self.scene:
+                self._swap_scene()
+                full_redraw = True
+
+            if animating or full_redraw:
+                events = pygame.event.get()
+            else:
+                # Idle: sleep until input or a data update arrives. The timeout
+                # still lets hide() and the stats panel get noticed.
+                first = pygame.event.wait(config.OVERLAY_IDLE_WAIT_MS)
+                events = ([first] if first.type != pygame.NOEVENT else []) + pygame.event.get()
 
-        while self.running:
-            screen.fill((255, 0, 255))  # Transparency key
             mouse_pos = pygame.mouse.get_pos()
-            self.hovered_item = None
+            hits = self.rect_index.query_point(*mouse_pos)
 
-            for event in pygame.event.get():
+            for event in events:
                 if event.type == pygame.QUIT:
-                    self.running = False
+                    self.stop_event.set()
                 elif event.type == pygame.MOUSEBUTTONDOWN:
-                    for item in self.text_data:
-                        x, y, w, h = self._bbox_to_rect(item["bbox"])
-                        if pygame.Rect(x, y, w, h).collidepoint(mouse_pos):
-                            self.clicked_item = item
-                            break
-
-            for item in self.text_data:
-                x, y, w, h = self._bbox_to_rect(item["bbox"])
-                rect = pygame.Rect(x, y, w, h)
-                self._draw_box_with_border(screen, rect, self.box_parts)
-
-                if rect.collidepoint(mouse_pos):
-                    self.hovered_item = item
-
-            if self.hovered_item:
-                tx = self.hovered_item.get("translation", "")
-                if tx:
-                    self.tooltip_text = tx
-                    self.tooltip_target_alpha = 255
-                    self.tooltip_pos = self._get_smart_tooltip_position(mouse_pos, tx, font)
-                    self.tooltip_alpha = min(self.tooltip_alpha + 15, 255)
-                    self._draw_tooltip_with_border(screen, font, self.tooltip_pos, tx, self.tooltip_alpha)
-            else:
-                self.tooltip_alpha = max(self.tooltip_alpha - 20, 0)
-                if self.tooltip_alpha > 0 and self.tooltip_text:
-                    self._draw_tooltip_with_border(screen, font, self.tooltip_pos, self.tooltip_text, self.tooltip_alpha)
+                    if hits:
+                        self.clicked_item = self.items[hits[0]]
 
+            # Topmost (last drawn) box wins the hover, first one wins the click
+            self.hovered_index = hits[-1] if hits else None
+            self.hovered_item = self.items[hits[-1]] if hits else None
 
-            if self.clicked_item:
-                tx = self.clicked_item.get("translation", "")
-                if tx:
-                    self._draw_expanded_box(screen, big_font, tx)
+            new_layers = self._scene_layers(mouse_pos, font, big_font, small_font)
 
-            pygame.display.update()
-            clock.tick(30)
+            # Only repaint where a layer appeared, moved, faded or changed content
+            if full_redraw:
+                dirty = [screen_rect]
+            else:
+                dirty = []
+                for name in set(layers) | set(new_layers):
+                    old, new = layers.get(name), new_layers.get(name)
+                    if old != new:
+                        dirty.extend(layer[1] for layer in (old, new) if layer is not None)
+            if len(dirty) > config.OVERLAY_MAX_DIRTY_RECTS:
+                dirty = [dirty[0].unionall(dirty[1:])]
+
+            for clip in dirty:
+                self._paint(screen, clip, new_layers)
+            if dirty:
+                pygame.display.update(dirty)
+
+            layers = new_layers
+            full_redraw = False
+            animating = self.tooltip_alpha not in (0, 255)
+            if animating:
+                clock.tick(30)
 
         pygame.display.quit()
         pygame.quit()
 
+    def _swap_scene(self):
+        # Render thread only: take the latest scene as the front buffer. Its
+        # box index was built on publish; cached surfaces are kept unless the
+        # previous scene stopped using them.
+        self.scene = self.published
+        self._prune_surface_cache()
+        self.cache_version = self.scene.version
+        self.items = self.scene.items
+        self.rect_index = self.scene.rect_index
+        self.hovered_item = None
+        self.hovered_index = None
+        # Keep the expanded box open if its line is still there (tracked lines keep their id)
+        if self.clicked_item is not None:
+            clicked_id = self.clicked_item.get("id")
+            self.clicked_item = next((item for item in self.items
+                                      if clicked_id is not None and item.get("id") == clicked_id), None)
+
+    def _prune_surface_cache(self):
+        stale = [key for key, (_, used) in self.surface_cache.items() if used < self.cache_version]
+        for key in stale:
+            del self.surface_cache[key]
+
+    def _scene_layers(self, mouse_pos, font, big_font, small_font):
+        # Everything drawn above the boxes, as name -> (surface, rect, alpha)
+        layers = {}
+        if self.hovered_item:
+            tx = self.hovered_item.get("translation", "")
+            if tx:
+                self.tooltip_text = tx
+                self.tooltip_target_alpha = 255
+                self.tooltip_pos = self._get_smart_tooltip_position(mouse_pos, tx, font)
+                self.tooltip_alpha = min(self.tooltip_alpha + 15, 255)
+        else:
+            self.tooltip_alpha = max(self.tooltip_alpha - 20, 0)
+        if self.tooltip_alpha > 0 and self.tooltip_text:
+            surf = self._cached(("tooltip", self.tooltip_text, id(font)),
+                                lambda: self._build_tooltip_surface(font, self.tooltip_text))
+            layers["tooltip"] = (surf, surf.get_rect(topleft=self.tooltip_pos), self.tooltip_alpha)
+
+        if self.clicked_item:
+            tx = self.clicked_item.get("translation", "")
+            if tx:
+                surf = self._cached(("expanded", tx, id(big_font)), lambda: self._build_expanded_box(big_font, tx))
+                x = (self.geometry["width"] - surf.get_width()) // 2
+                y = self.geometry["height"] - surf.get_height() - 40
+                layers["expanded"] = (surf, surf.get_rect(topleft=(x, y)), 255)
+
+        if config.METRICS_OVERLAY_PANEL:
+            lines = tuple(self.stats_lines())
+            if lines:
+                surf = self._cached(("stats", lines), lambda: self._build_stats_panel(small_font, lines))
+                layers["stats"] = (surf, surf.get_rect(topleft=(10, 10)), 255)
+        return layers
+
+    def _paint(self, screen, clip, layers):
+        screen.set_clip(clip)
+        screen.fill((255, 0, 255))  # Transparency key
+        for i in self.rect_index.query_rect(clip.x, clip.y, clip.width, clip.height):
+            self._draw_box_with_border(screen, pygame.Rect(self.rect_index.rect(i)), self.box_parts)
+        for name in ("tooltip", "expanded", "stats"):
+            layer = layers.get(name)
+            if layer is not None and layer[1].colliderect(clip):
+                surf, rect, alpha = layer
+                surf.set_alpha(alpha)
+                screen.blit(surf, rect)
+        screen.set_clip(None)
+
+    def _wake(self):
+        # Nudge an idle render loop (blocked in event.wait) from another thread
+        if self.thread is not None and self.thread.is_alive() and pygame.display.get_init():
+            try:
+                pygame.event.post(pygame.event.Event(pygame.USEREVENT))
+            except pygame.error:
+                pass
+
     def _set_clickable(self, enable=True):
         style = win32gui.GetWindowLong(self.hwnd, win32con.GWL_EXSTYLE)
         if enable:
@@ -136,49 +280,55 @@ class OverlayWindow:
         )
 
 
+    def _cached(self, key, build):
+        entry = self.surface_cache.get(key)
+        if entry is None:
+            entry = self.surface_cache[key] = [build(), self.cache_version]
+        else:
+            entry[1] = self.cache_version
+        return entry[0]
+
     def _draw_box_with_border(self, surface, rect, parts):
-        x, y, w, h = rect.x, rect.y, rect.width, rect.height
+        box = self._cached(("box", rect.width, rect.height, id(parts)),
+                           lambda: self._build_box_surface(rect.width, rect.height, parts))
+        surface.blit(box, (rect.x, rect.y))
+
+    def _build_box_surface(self, w, h, parts):
+        box = pygame.Surface((max(w, 1), max(h, 1)), pygame.SRCALPHA)
         tile_w, tile_h = parts["c"].get_size()
 
         # Corners
-        surface.blit(parts["tl"], (x, y))
-        surface.blit(parts["tr"], (x + w - tile_w, y))
-        surface.blit(parts["bl"], (x, y + h - tile_h))
-        surface.blit(parts["br"], (x + w - tile_w, y + h - tile_h))
+        box.blit(parts["tl"], (0, 0))
+        box.blit(parts["tr"], (w - tile_w, 0))
+        box.blit(parts["bl"], (0, h - tile_h))
+        box.blit(parts["br"], (w - tile_w, h - tile_h))
 
         # Top / Bottom edges
-        for i in range(x + tile_w, x + w - tile_w, tile_w):
-            surface.blit(parts["t"], (i, y))
-            surface.blit(parts["b"], (i, y + h - tile_h))
+        for i in range(tile_w, w - tile_w, tile_w):
+            box.blit(parts["t"], (i, 0))
+            box.blit(parts["b"], (i, h - tile_h))
 
         # Left / Right edges
-        for j in range(y + tile_h, y + h - tile_h, tile_h):
-            surface.blit(parts["l"], (x, j))
-            surface.blit(parts["r"], (x + w - tile_w, j))
+        for j in range(tile_h, h - tile_h, tile_h):
+            box.blit(parts["l"], (0, j))
+            box.blit(parts["r"], (w - tile_w, j))
+        return box
 
+    def _render_text_with_outline(self, font, text, color, outline_color):
+        # Outline rings are rasterized once per glyph and colour by the atlas
+        return font.render_outlined(text, color, outline_color)
 
-    def _draw_tooltip_with_border(self, surface, font, pos, text, alpha=255):
+    def _build_tooltip_surface(self, font, text):
         parts = self.tooltip_parts
         padding = 6
 
-        def render_text_with_outline(text, font, color, outline_color):
-            base = font.render(text, True, color)
-            outline = pygame.Surface((base.get_width() + 2, base.get_height() + 2), pygame.SRCALPHA)
-            for dx in (-1, 0, 1):
-                for dy in (-1, 0, 1):
-                    if dx != 0 or dy != 0:
-                        outline.blit(font.render(text, True, outline_color), (1 + dx, 1 + dy))
-            outline.blit(base, (1, 1))
-            return outline
-
-        text_surf = render_text_with_outline(text, font, (255, 255, 255), (150, 100, 200))
+        text_surf = self._render_text_with_outline(font, text, (255, 255, 255), (150, 100, 200))
         text_rect = text_surf.get_rect()
         content_w = text_rect.width + padding * 2
         content_h = text_rect.height + padding * 2
         tile_w, tile_h = parts["c"].get_size()
         total_w = content_w + tile_w * 2
         total_h = content_h + tile_h * 2
-        x, y = pos
 
         tooltip_surf = pygame.Surface((total_w, total_h), pygame.SRCALPHA)
 
@@ -203,76 +353,58 @@ class OverlayWindow:
 
         # Text
         tooltip_surf.blit(text_surf, (tile_w + padding, tile_h + padding))
+        return tooltip_surf
 
-        # Apply fade
-        tooltip_surf.set_alpha(alpha)
-        surface.blit(tooltip_surf, (x, y))
-
-    def _draw_expanded_box(self, surface, font, text):
+    def _build_expanded_box(self, font, text):
         padding = 10
         width = 400
         lines = self._wrap_text(font, text, width - padding * 2)
         height = padding * 2 + len(lines) * font.get_height()
-        x = (self.geometry["width"] - width) // 2
-        y = self.geometry["height"] - height - 40
 
-        box_rect = pygame.Rect(x, y, width, height)
-        pygame.draw.rect(surface, (0, 0, 0), box_rect)
-        pygame.draw.rect(surface, (255, 255, 255), box_rect, 2)
+        box = pygame.Surface((width, height))
+        box_rect = box.get_rect()
+        pygame.draw.rect(box, (0, 0, 0), box_rect)
+        pygame.draw.rect(box, (255, 255, 255), box_rect, 2)
+
+        for i, line in enumerate(lines):
+            font.draw(box, line, (padding, padding + i * font.get_height()), (255, 255, 255))
+        return box
 
+    def _build_stats_panel(self, font, lines):
+        padding = 6
+        line_h = font.get_height() + 2
+        width = max(font.size(line)[0] for line in lines) + padding * 2
+        height = len(lines) * line_h + padding * 2
+        panel = pygame.Surface((width, height))
+        panel.fill((0, 0, 0))
         for i, line in enumerate(lines):
-            text_surf = font.render(line, True, (255, 255, 255))
-            surface.blit(text_surf, (x + padding, y + padding + i * font.get_height()))
+            font.draw(panel, line, (padding, padding + i * line_h), (120, 255, 120))
+        return panel
 
     def _wrap_text(self, font, text, max_width):
-        words = text.split(" ")
-        lines = []
-        current = ""
-        for word in words:
-            test = current + (" " if current else "") + word
-            if font.size(test)[0] <= max_width:
-                current = test
-            else:
-                lines.append(current)
-                current = word
-        if current:
-            lines.append(current)
-        return lines
-
-    def _load_tooltip_parts(self):
-        load = lambda name: pygame.image.load(os.path.join("assets", "tooltip_small", name)).convert_alpha()
-        self.tooltip_parts = {
-            "tl": load("top_left.png"),
-            "t":  load("top.png"),
-            "tr": load("top_right.png"),
-            "l":  load("left.png"),
-            "c":  load("center.png"),
-            "r":  load("right.png"),
-            "bl": load("bottom_left.png"),
-            "b":  load("bottom.png"),
-            "br": load("bottom_right.png"),
-        }
-
-    def _load_box_parts(self):
-        load = lambda name: pygame.image.load(os.path.join("assets", "box_border_small", name)).convert_alpha()
-        self.box_parts = {
-            "tl": load("top_left.png"),
-            "t":  load("top.png"),
-            "tr": load("top_right.png"),
-            "l":  load("left.png"),
-            "c":  load("center.png"),
-            "r":  load("right.png"),
-            "bl": load("bottom_left.png"),
-            "b":  load("bottom.png"),
-            "br": load("bottom_right.png"),
-        }
+        return font.wrap(text, max_width)
+
+    def _load_parts(self):
+        # Nine-slice sets come from the packed atlas, read once per process
+        parts = asset_atlas.load(self._ui_scale())
+        self.tooltip_parts = parts["tooltip"]
+        self.box_parts = parts["box_border"]
+
+    def _ui_scale(self):
+        if config.OVERLAY_UI_SCALE:
+            return config.OVERLAY_UI_SCALE
+        if win32gui is not None and self.hwnd:
+            try:
+                return ctypes.windll.user32.GetDpiForWindow(self.hwnd) / 96
+            except (AttributeError, OSError):
+                pass
+        return 1.0
 
     def _get_smart_tooltip_position(self, mouse_pos, text, font):
         padding = 12
-        text_surf = font.render(text, True, (255, 255, 255))
-        text_rect = text_surf.get_rect()
-        content_w = text_rect.width + padding * 2
-        content_h = text_rect.height + padding * 2
+        text_w, text_h = font.size(text)
+        content_w = text_w + padding * 2
+        content_h = text_h + padding * 2
 
         tile_w, tile_h = self.tooltip_parts["c"].get_size()
         total_w = content_w + tile_w * 2
@@ -290,11 +422,103 @@ class OverlayWindow:
             x = 5
         if y < 0:
             y = mouse_pos[1] + 20  # flip below mouse if above is off screen
-        return x, y
-
-    def _bbox_to_rect(self, bbox):
-        xs = [pt[0] for pt in bbox]
-        ys = [pt[1] for pt in bbox]
-        x, y = min(xs), min(ys)
-        w, h = max(xs) - x, max(ys) - y
-        return int(x), int(y), int(w), int(h)
+
+        if self.hovered_index is None:
+            return x, y
+        hovered = self.hovered_index
+        if not self.rect_index.overlap_area(x, y, total_w, total_h, exclude=hovered):
+            return x, y
+
+        # Default spot covers other lines (the hovered one never counts): try
+        # above/below/beside the hovered box and keep whichever hides the least
+        # box area
+        bx, by, bw, bh = self.rect_index.rect(hovered)
+        candidates = [
+            (x, y),
+            (mouse_pos[0], by - total_h - 4),
+            (mouse_pos[0], by + bh + 4),
+            (bx + bw + 4, mouse_pos[1] - total_h // 2),
+            (bx - total_w - 4, mouse_pos[1] - total_h // 2),
+        ]
+        best, best_area = (x, y), None
+        for cx, cy in candidates:
+            cx = max(5, min(cx, screen_w - total_w - 5))
+            cy = max(0, min(cy, screen_h - total_h))
+            area = self.rect_index.overlap_area(cx, cy, total_w, total_h, exclude=hovered)
+            if best_area is None or area < best_area:
+                best, best_area = (cx, cy), area
+                if area == 0:
+                    break
+        return best
+
+
+def _overlay_process_main(commands, running, text_data, geometry):
+    overlay = OverlayWindow(text_data, geometry)
+    stats = []
+    overlay.stats_lines = lambda: stats
+    while True:
+        try:
+            command, arg = commands.get(timeout=0.5)
+        except queue.Empty:
+            command = None
+        if command == "show":
+            overlay.show()
+        elif command in ("hide", "close"):
+            overlay.hide()
+        elif command == "data":
+            items, stats = arg
+            overlay.update_data(items)
+        if overlay.running:
+            running.set()
+        else:
+            running.clear()
+        if command == "close":
+            return
+
+
+class OverlayProcess:
+    # Same interface as OverlayWindow, but the window lives in a child
+    # process: pygame drives one display window per process, so a second
+    # monitor's overlay can't share this one. Items are sent as plain dicts.
+    ITEM_KEYS = ("bbox", "text", "confidence", "translation", "id")
+
+    def __init__(self, text_data, geometry):
+        self.geometry = geometry
+        context = multiprocessing.get_context("spawn")
+        self.commands = context.Queue()
+        self.running_event = context.Event()
+        self.process = context.Process(target=_overlay_process_main, name="overlay",
+                                       args=(self.commands, self.running_event, self._plain(text_data), geometry),
+                                       daemon=True)
+
+    @property
+    def running(self):
+        return self.process.is_alive() and self.running_event.is_set()
+
+    def _plain(self, text_data):
+        items = []
+        for item in text_data:
+            plain = {key: item[key] for key in self.ITEM_KEYS if key in item}
+            if plain.get("translation") is not None:
+                plain["translation"] = str(plain["translation"])
+            items.append(plain)
+        return items
+
+    def show(self):
+        if self.process.pid is None:
+            self.process.start()
+        self.commands.put(("show", None))
+
+    def hide(self):
+        if self.process.is_alive():
+            self.commands.put(("hide", None))
+
+    def update_data(self, new_text_data):
+        # The metrics panel rides along: this process's tracer has the timings
+        stats = list(tracer.stats_lines()) if config.METRICS_OVERLAY_PANEL else []
+        self.commands.put(("data", (self._plain(new_text_data), stats)))
+
+    def close(self):
+        if self.process.is_alive():
+            self.commands.put(("close", None))
+            self.process.join(timeout=3)
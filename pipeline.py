@@ -0,0 +1,140 @@
+import queue
+import threading
+import time
+
+import config
+from metrics import tracer as default_tracer
+
+
+def put_latest(q, item):
+    # Non-blocking put that evicts the oldest queued item instead of waiting.
+    # Returns the stale item that was dropped to make room, if any.
+    dropped = None
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                dropped = q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+class ContinuousPipeline:
+    # capture -> OCR -> translate/publish, each stage on its own thread with
+    # small bounded queues in between. While frame N is being translated,
+    # frame N+1 is already being captured and OCR'd. Each frame carries its
+    # own trace through the stages.
+    def __init__(self, capture_fn, ocr_fn, translate_fn, publish_fn,
+                 interval=config.AUTO_REFRESH_INTERVAL, queue_size=config.PIPELINE_QUEUE_SIZE,
+                 tracer=default_tracer):
+        self.capture_fn = capture_fn
+        self.ocr_fn = ocr_fn
+        self.translate_fn = translate_fn
+        self.publish_fn = publish_fn
+        self.interval = interval
+        self.tracer = tracer
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.results = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.dropped_frames = 0
+        self.dropped_results = 0
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self.threads)
+
+    def start(self):
+        if self.running:
+            return
+        self.stop_event.clear()
+        self.threads = [
+            threading.Thread(target=self._capture_loop, name="pipeline-capture", daemon=True),
+            threading.Thread(target=self._ocr_loop, name="pipeline-ocr", daemon=True),
+            threading.Thread(target=self._translate_loop, name="pipeline-translate", daemon=True),
+        ]
+        for t in self.threads:
+            t.start()
+        print(f"[Pipeline] Auto-refresh started ({self.interval:.2f}s interval)")
+
+    def stop(self):
+        self.stop_event.set()
+        for t in self.threads:
+            if t is not threading.current_thread():
+                t.join(timeout=5)
+        self.threads = []
+        for q in (self.frames, self.results):
+            while not q.empty():
+                q.get_nowait()
+        print(f"[Pipeline] Auto-refresh stopped "
+              f"(dropped {self.dropped_frames} frames, {self.dropped_results} OCR results)")
+
+    def _next(self, q):
+        while not self.stop_event.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def _drop(self, item, stage):
+        # Dropped frames get their own trace name so they don't skew refresh latency
+        trace = item[0]
+        trace.name = "auto_refresh.dropped"
+        trace.attrs["dropped_at"] = stage
+        self.tracer.finish_trace(trace)
+
+    def _fail(self, trace, stage, e):
+        trace.error = {"stage": stage, "type": type(e).__name__, "message": str(e)}
+        self.tracer.finish_trace(trace)
+        print(f"[Pipeline] {stage} failed on frame {trace.id}: {e}")
+
+    def _capture_loop(self):
+        while not self.stop_event.is_set():
+            start = time.time()
+            trace = self.tracer.start_trace("auto_refresh")
+            try:
+                with self.tracer.activate(trace):
+                    image_np, geometry = self.capture_fn()
+            except Exception as e:
+                self._fail(trace, "capture", e)
+            else:
+                dropped = put_latest(self.frames, (trace, image_np, geometry))
+                if dropped:
+                    self.dropped_frames += 1
+                    self._drop(dropped, "ocr_queue")
+            self.stop_event.wait(max(0.0, self.interval - (time.time() - start)))
+
+    def _ocr_loop(self):
+        while True:
+            item = self._next(self.frames)
+            if item is None:
+                return
+            trace, image_np, geometry = item
+            try:
+                with self.tracer.activate(trace):
+                    data = self.ocr_fn(image_np, geometry)
+            except Exception as e:
+                self._fail(trace, "ocr", e)
+                continue
+            dropped = put_latest(self.results, (trace, data, geometry))
+            if dropped:
+                self.dropped_results += 1
+                self._drop(dropped, "translate_queue")
+
+    def _translate_loop(self):
+        while True:
+            item = self._next(self.results)
+            if item is None:
+                return
+            trace, data, geometry = item
+            try:
+                with self.tracer.activate(trace):
+                    self.translate_fn(data)
+                    self.publish_fn(data, geometry)
+            except Exception as e:
+                self._fail(trace, "translate/publish", e)
+            else:
+                self.tracer.finish_trace(trace)
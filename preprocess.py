@@ -0,0 +1,71 @@
+import cv2
+
+from profiles import get_profile
+
+
+class PreparedFrame:
+    # grey: recognizer input, frame-sized uint8 (the only full-frame copy)
+    # detect: 3-channel detector input at detect_scale
+    __slots__ = ("grey", "detect", "detect_scale")
+
+    def __init__(self, grey, detect, detect_scale):
+        self.grey = grey
+        self.detect = detect
+        self.detect_scale = detect_scale
+
+
+_clahe = {}
+
+def _get_clahe(clip):
+    if clip not in _clahe:
+        _clahe[clip] = cv2.createCLAHE(clipLimit=clip, tileGridSize=(8, 8))
+    return _clahe[clip]
+
+
+def to_grey(image_np, writable=False):
+    # BGR(A) straight to one-channel, no intermediate BGR copy. Already-grey
+    # input is only copied when the caller is going to modify it.
+    if image_np.ndim == 2:
+        return image_np.copy() if writable else image_np
+    code = cv2.COLOR_BGRA2GRAY if image_np.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+    return cv2.cvtColor(image_np, code)
+
+
+def normalize_contrast(grey, mode, clip=2.0):
+    if mode == "normalize":
+        cv2.normalize(grey, grey, 0, 255, cv2.NORM_MINMAX)
+    elif mode == "clahe":
+        _get_clahe(clip).apply(grey, grey)
+    elif mode:
+        raise ValueError(f"Unknown contrast mode '{mode}'")
+    return grey
+
+
+def binarize(grey, block, c):
+    # Mean-adaptive threshold copes with gradients and textured text boxes
+    # where a global threshold would swallow whole lines
+    block = max(3, block | 1)
+    cv2.adaptiveThreshold(grey, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, block, c, grey)
+    return grey
+
+
+def upscale(grey_crop, factor):
+    return cv2.resize(grey_crop, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC)
+
+
+def prepare(image_np, profile=None, detect=True):
+    profile = profile or get_profile()
+    modifies = bool(profile["contrast"] or profile["threshold"])
+    grey = to_grey(image_np, writable=modifies)
+    if profile["contrast"]:
+        normalize_contrast(grey, profile["contrast"], profile["clahe_clip"])
+
+    detect_image, scale = None, profile["detect_scale"]
+    if detect:
+        small = grey if scale == 1 else cv2.resize(grey, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        detect_image = cv2.cvtColor(small, cv2.COLOR_GRAY2RGB)
+
+    # Binarize last so the detector still gets the grey image
+    if profile["threshold"]:
+        binarize(grey, profile["threshold_block"], profile["threshold_c"])
+    return PreparedFrame(grey, detect_image, scale)
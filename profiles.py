@@ -0,0 +1,25 @@
+import config
+
+_active = config.PROFILE
+
+
+def get_profile(name=None):
+    # PROFILE_DEFAULTS overlaid with the named (or active) profile
+    name = name or _active
+    if name not in config.PROFILES:
+        raise ValueError(f"Unknown profile '{name}' (available: {', '.join(config.PROFILES)})")
+    profile = dict(config.PROFILE_DEFAULTS)
+    profile.update(config.PROFILES[name])
+    profile["name"] = name
+    return profile
+
+
+def set_profile(name):
+    global _active
+    get_profile(name)
+    _active = name
+    print(f"[Profile] Using '{name}'")
+
+
+def active_profile():
+    return _active
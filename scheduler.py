@@ -0,0 +1,90 @@
+import threading
+import traceback
+
+
+class RefreshCancelled(Exception):
+    pass
+
+
+class RefreshToken:
+    # Handed to each job; goes stale as soon as a newer request (or cancel) arrives
+    def __init__(self, scheduler, generation):
+        self.scheduler = scheduler
+        self.generation = generation
+
+    @property
+    def cancelled(self):
+        return self.scheduler.generation != self.generation
+
+    def check(self):
+        if self.cancelled:
+            raise RefreshCancelled()
+
+
+class RefreshScheduler:
+    # Runs refresh jobs one at a time on a worker thread. Requests arriving
+    # while a job is queued collapse into it; a request arriving while a job
+    # runs makes it stale, so it stops at its next check() and the newest
+    # request runs instead. Callers never block.
+    def __init__(self, job, name="refresh-scheduler"):
+        self.job = job
+        self.generation = 0
+        self.pending = False
+        self.stopped = False
+        self.busy = False
+        self.requests = 0
+        self.coalesced = 0
+        self.superseded = 0
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def request(self):
+        with self.condition:
+            self.requests += 1
+            if self.pending:
+                self.coalesced += 1
+            self.generation += 1
+            self.pending = True
+            self.condition.notify()
+
+    def cancel(self, wait=False):
+        # Drop the queued request and stop the running job at its next check.
+        # With wait, also block until that job has returned.
+        with self.condition:
+            self.generation += 1
+            self.pending = False
+            while wait and self.busy and self.thread is not threading.current_thread():
+                self.condition.wait()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.generation += 1
+            self.pending = False
+            self.condition.notify()
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                self.pending = False
+                self.busy = True
+                token = RefreshToken(self, self.generation)
+            try:
+                self.job(token)
+            except RefreshCancelled:
+                pass
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self.condition:
+                    if token.cancelled:
+                        self.superseded += 1
+                    self.busy = False
+                    self.condition.notify_all()
@@ -0,0 +1,30 @@
+import numpy as np
+
+# Hiragana + katakana, CJK extension A, CJK unified ideographs
+JAPANESE_RANGES = ((0x3040, 0x30FF), (0x3400, 0x4DBF), (0x4E00, 0x9FFF))
+
+_table = np.zeros(0x10000, dtype=np.bool_)
+for _lo, _hi in JAPANESE_RANGES:
+    _table[_lo:_hi + 1] = True
+
+
+def japanese_counts(texts):
+    # Japanese character count per string, in one pass over every string's
+    # code points at once instead of a regex per string
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    if not lengths.sum():
+        return np.zeros(len(texts), dtype=np.int64), lengths
+    codepoints = np.frombuffer("".join(texts).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    hits = _table[np.minimum(codepoints, 0xFFFF)]
+    totals = np.concatenate(([0], np.cumsum(hits, dtype=np.int64)))
+    ends = np.cumsum(lengths)
+    return totals[ends] - totals[ends - lengths], lengths
+
+
+def japanese_mask(texts, min_chars=2, min_ratio=0.5):
+    # True where a string has at least min_chars Japanese characters making up
+    # at least min_ratio of it
+    if not texts:
+        return np.zeros(0, dtype=np.bool_)
+    counts, lengths = japanese_counts([t or "" for t in texts])
+    return (lengths > 0) & (counts >= min_chars) & (counts >= min_ratio * lengths)
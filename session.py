@@ -0,0 +1,258 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+
+import numpy as np
+
+import config
+
+# Session directory layout:
+#   frames.bin       encoded frames back to back (PNG by default)
+#   frames.idx       int64 (offset, length) per frame
+#   snapshots.jsonl  one JSON object per refresh: time, geometry, frame number, items
+#   snapshots.idx    int64 (offset, length) per snapshot
+# Data is written before its index entry, so a session cut short by a crash
+# still opens with every snapshot that was fully written.
+FRAMES_DATA = "frames.bin"
+FRAMES_INDEX = "frames.idx"
+SNAPSHOTS_DATA = "snapshots.jsonl"
+SNAPSHOTS_INDEX = "snapshots.idx"
+
+ITEM_KEYS = ("bbox", "text", "confidence", "translation", "id")
+
+
+def _json_default(value):
+    # OCR results carry numpy scalars
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _append_index(f, offset, length):
+    f.write(np.array([offset, length], dtype=np.int64).tobytes())
+    f.flush()
+
+
+def _read_index(path):
+    if not os.path.exists(path):
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.fromfile(path, dtype=np.int64).reshape(-1, 2)
+
+
+class SessionWriter:
+    # Appends snapshots from the refresh threads. The caller only pays for a
+    # frame copy; encoding and disk writes happen on a background thread.
+    def __init__(self, path, frame_format=config.SESSION_FRAME_FORMAT, quality=config.SESSION_FRAME_QUALITY):
+        self.path = path
+        self.frame_format = frame_format
+        self.quality = quality
+        os.makedirs(path, exist_ok=True)
+        self.files = {name: open(os.path.join(path, name), "ab")
+                      for name in (FRAMES_DATA, FRAMES_INDEX, SNAPSHOTS_DATA, SNAPSHOTS_INDEX)}
+        self.frame_count = len(_read_index(os.path.join(path, FRAMES_INDEX)))
+        self.snapshot_count = len(_read_index(os.path.join(path, SNAPSHOTS_INDEX)))
+        self.last_frame_hash = None
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._write_loop, name="session-writer", daemon=True)
+        self.thread.start()
+        print(f"[Session] Recording to {path} ({self.snapshot_count} snapshots so far)")
+
+    @staticmethod
+    def hold_frame(frame):
+        # Capture backends reuse their buffers, so keep a private copy until append()
+        return None if frame is None else np.array(frame, copy=True)
+
+    def append(self, data, geometry, frame=None, trace_id=None):
+        items = [{key: item[key] for key in ITEM_KEYS if key in item} for item in data]
+        self.queue.put((frame, {
+            "time": time.time(),
+            "trace_id": trace_id,
+            "geometry": dict(geometry),
+            "items": items,
+        }))
+
+    def _write_loop(self):
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                self.queue.task_done()
+                return
+            frame, record = entry
+            try:
+                record["frame"] = self._write_frame(frame) if frame is not None else None
+                self._write_snapshot(record)
+            except Exception as e:
+                print(f"[Session] Could not write snapshot: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _write_frame(self, frame):
+        # Consecutive identical frames (static screen) are stored once
+        frame_hash = (zlib.crc32(frame.data if frame.flags.c_contiguous else frame.tobytes()), frame.shape)
+        if frame_hash == self.last_frame_hash:
+            return self.frame_count - 1
+
+        import cv2
+        params = []
+        if self.frame_format in (".jpg", ".jpeg", ".webp"):
+            if frame.ndim == 3 and frame.shape[2] == 4:
+                frame = frame[:, :, :3]
+            quality_flag = cv2.IMWRITE_WEBP_QUALITY if self.frame_format == ".webp" else cv2.IMWRITE_JPEG_QUALITY
+            params = [quality_flag, self.quality]
+        ok, encoded = cv2.imencode(self.frame_format, frame, params)
+        if not ok:
+            raise ValueError(f"Could not encode frame as {self.frame_format}")
+
+        data_file = self.files[FRAMES_DATA]
+        offset = data_file.tell()
+        data_file.write(encoded.tobytes())
+        data_file.flush()
+        _append_index(self.files[FRAMES_INDEX], offset, len(encoded))
+        self.last_frame_hash = frame_hash
+        self.frame_count += 1
+        return self.frame_count - 1
+
+    def _write_snapshot(self, record):
+        line = (json.dumps(record, ensure_ascii=False, default=_json_default) + "\n").encode("utf-8")
+        data_file = self.files[SNAPSHOTS_DATA]
+        offset = data_file.tell()
+        data_file.write(line)
+        data_file.flush()
+        _append_index(self.files[SNAPSHOTS_INDEX], offset, len(line))
+        self.snapshot_count += 1
+
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        for f in self.files.values():
+            f.close()
+        print(f"[Session] Closed {self.path} ({self.snapshot_count} snapshots)")
+
+
+class Snapshot:
+    def __init__(self, reader, index, record):
+        self.reader = reader
+        self.index = index
+        self.time = record["time"]
+        self.trace_id = record.get("trace_id")
+        self.geometry = record["geometry"]
+        self.data = record["items"]
+        self.frame_index = record.get("frame")
+
+    def frame(self):
+        # Decoded on demand
+        if self.frame_index is None:
+            return None
+        return self.reader.frame(self.frame_index)
+
+
+class SessionReader:
+    # Random access over a (possibly still growing) session directory. Only
+    # the small index files are read up front; snapshots and frames are read
+    # with a single seek each.
+    def __init__(self, path):
+        self.path = path
+        self.frames_data = open(os.path.join(path, FRAMES_DATA), "rb")
+        self.snapshots_data = open(os.path.join(path, SNAPSHOTS_DATA), "rb")
+        self.lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        # Pick up snapshots appended since the reader was opened
+        self.frame_index = _read_index(os.path.join(self.path, FRAMES_INDEX))
+        self.snapshot_index = _read_index(os.path.join(self.path, SNAPSHOTS_INDEX))
+
+    def __len__(self):
+        return len(self.snapshot_index)
+
+    def _read(self, f, offset, length):
+        with self.lock:
+            f.seek(int(offset))
+            return f.read(int(length))
+
+    def snapshot(self, index):
+        index = range(len(self))[index]
+        offset, length = self.snapshot_index[index]
+        return Snapshot(self, index, json.loads(self._read(self.snapshots_data, offset, length)))
+
+    def frame(self, index):
+        import cv2
+        offset, length = self.frame_index[index]
+        encoded = np.frombuffer(self._read(self.frames_data, offset, length), dtype=np.uint8)
+        return cv2.imdecode(encoded, cv2.IMREAD_UNCHANGED)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.snapshot(i)
+
+    def close(self):
+        self.frames_data.close()
+        self.snapshots_data.close()
+
+
+def new_session_path(root=config.SESSION_DIR):
+    return os.path.join(root, time.strftime("%Y%m%d-%H%M%S"))
+
+
+def load_overlay(path, index=-1):
+    # OverlayWindow for a recorded snapshot, no capture or OCR involved
+    from overlay_pygame import OverlayWindow
+    reader = SessionReader(path)
+    try:
+        snapshot = reader.snapshot(index)
+    finally:
+        reader.close()
+    print(f"[Session] Snapshot {snapshot.index} from {time.strftime('%H:%M:%S', time.localtime(snapshot.time))}, "
+          f"{len(snapshot.data)} lines")
+    return OverlayWindow(snapshot.data, snapshot.geometry)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or re-display recorded overlay snapshots")
+    parser.add_argument("action", choices=["list", "show", "export-frame"])
+    parser.add_argument("session", help="session directory")
+    parser.add_argument("--index", type=int, default=-1, help="snapshot number (negative counts from the end)")
+    parser.add_argument("--out", default="frame.png", help="export-frame: output image")
+    args = parser.parse_args()
+
+    if args.action == "show":
+        overlay = load_overlay(args.session, args.index)
+        overlay.show()
+        try:
+            while overlay.running:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            overlay.hide()
+        return
+
+    reader = SessionReader(args.session)
+    if args.action == "list":
+        for snapshot in reader:
+            stamp = time.strftime("%H:%M:%S", time.localtime(snapshot.time))
+            print(f"{snapshot.index:5d}  {stamp}  frame {snapshot.frame_index}  {len(snapshot.data)} lines")
+        print(f"[Session] {len(reader)} snapshots, {len(reader.frame_index)} distinct frames")
+    else:
+        import cv2
+        frame = reader.snapshot(args.index).frame()
+        if frame is None:
+            print("[Session] Snapshot has no frame")
+        else:
+            cv2.imwrite(args.out, frame)
+            print(f"[Session] Wrote {args.out}")
+    reader.close()
+
+
+if __name__ == "__main__":
+    main()
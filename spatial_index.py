@@ -0,0 +1,72 @@
+import numpy as np
+
+import config
+
+
+def bboxes_to_rects(bboxes):
+    # Quadrilateral OCR boxes -> int32 array of (x, y, w, h): the bounding
+    # box's min corner and its width/height, each truncated towards zero
+    if not bboxes:
+        return np.zeros((0, 4), dtype=np.int32)
+    pts = np.asarray(bboxes, dtype=np.float64)
+    mins = pts.min(axis=1)
+    maxs = pts.max(axis=1)
+    rects = np.empty((len(pts), 4), dtype=np.int32)
+    rects[:, :2] = mins.astype(np.int32)
+    rects[:, 2:] = (maxs - mins).astype(np.int32)
+    return rects
+
+
+class RectIndex:
+    # Uniform grid over a fixed set of (x, y, w, h) rects. Each cell lists the
+    # rects overlapping it, so point and rect queries only look at a handful
+    # of candidates regardless of how many lines were detected.
+    def __init__(self, rects, cell_size=config.OVERLAY_GRID_CELL):
+        self.rects = np.asarray(rects, dtype=np.int32).reshape(-1, 4)
+        self.cell_size = cell_size
+        self.cells = {}
+        for i, (x, y, w, h) in enumerate(self.rects.tolist()):
+            for cx in range(x // cell_size, (x + max(w, 1) - 1) // cell_size + 1):
+                for cy in range(y // cell_size, (y + max(h, 1) - 1) // cell_size + 1):
+                    self.cells.setdefault((cx, cy), []).append(i)
+
+    def __len__(self):
+        return len(self.rects)
+
+    def rect(self, i):
+        return tuple(int(v) for v in self.rects[i])
+
+    def query_point(self, x, y):
+        # Indices (ascending) of rects containing the point, pygame collidepoint semantics
+        candidates = self.cells.get((x // self.cell_size, y // self.cell_size))
+        if not candidates:
+            return []
+        r = self.rects[candidates]
+        hit = (r[:, 0] <= x) & (x < r[:, 0] + r[:, 2]) & (r[:, 1] <= y) & (y < r[:, 1] + r[:, 3])
+        return [candidates[i] for i in np.nonzero(hit)[0]]
+
+    def _candidates(self, x, y, w, h):
+        size = self.cell_size
+        found = set()
+        for cx in range(x // size, (x + max(w, 1) - 1) // size + 1):
+            for cy in range(y // size, (y + max(h, 1) - 1) // size + 1):
+                found.update(self.cells.get((cx, cy), ()))
+        return sorted(found)
+
+    def query_rect(self, x, y, w, h):
+        candidates = self._candidates(x, y, w, h)
+        if not candidates:
+            return []
+        r = self.rects[candidates]
+        hit = (r[:, 0] < x + w) & (x < r[:, 0] + r[:, 2]) & (r[:, 1] < y + h) & (y < r[:, 1] + r[:, 3])
+        return [candidates[i] for i in np.nonzero(hit)[0]]
+
+    def overlap_area(self, x, y, w, h, exclude=None):
+        # Total area of indexed rects covered by (x, y, w, h)
+        candidates = [i for i in self._candidates(x, y, w, h) if i != exclude]
+        if not candidates:
+            return 0
+        r = self.rects[candidates].astype(np.int64)
+        ow = np.minimum(r[:, 0] + r[:, 2], x + w) - np.maximum(r[:, 0], x)
+        oh = np.minimum(r[:, 1] + r[:, 3], y + h) - np.maximum(r[:, 1], y)
+        return int((np.clip(ow, 0, None) * np.clip(oh, 0, None)).sum())
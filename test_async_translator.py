@@ -0,0 +1,76 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+
+from async_translator import AsyncTranslator, GoogleRestBackend, chunk_texts
+from mock_translate_server import make_app
+
+
+def test_chunk_texts_respects_segment_limit():
+    assert chunk_texts(["a"] * 5, max_segments=2, max_chars=100) == [[0, 1], [2, 3], [4]]
+
+
+def test_chunk_texts_respects_char_limit():
+    assert chunk_texts(["aaa", "bb", "cccc", "d"], max_segments=10, max_chars=5) == [[0, 1], [2, 3]]
+
+
+def test_chunk_texts_long_text_gets_own_chunk():
+    assert chunk_texts(["a", "x" * 20, "b"], max_segments=10, max_chars=5) == [[0], [1], [2]]
+
+
+def test_chunk_texts_empty():
+    assert chunk_texts([]) == []
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def mock_server():
+    # Runs make_app() on its own event loop thread; yields a start(fail_rate) -> endpoint function
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    runners = []
+
+    def start(fail_rate):
+        from aiohttp import web
+        port = _free_port()
+
+        async def _start():
+            runner = web.AppRunner(make_app(latency=0.01, fail_rate=fail_rate))
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", port).start()
+            return runner
+
+        runners.append(asyncio.run_coroutine_threadsafe(_start(), loop).result(timeout=5))
+        return f"http://127.0.0.1:{port}/language/translate/v2"
+
+    yield start
+    for runner in runners:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+
+
+@pytest.mark.parametrize("fail_rate", [0.0, 1.0])
+def test_async_translator_against_mock_server(mock_server, fail_rate):
+    translator = AsyncTranslator(GoogleRestBackend(endpoint=mock_server(fail_rate)),
+                                 concurrency=4, retries=1, backoff=0.01, timeout=5)
+    texts = [f"line {i}" for i in range(300)]
+    try:
+        results = translator.translate(texts, source_language="ja", target_language="en")
+    finally:
+        translator.close()
+
+    assert len(results) == len(texts)
+    if fail_rate:
+        # Every chunk fails after its retries, each item comes back as None
+        assert all(r["translatedText"] is None for r in results)
+    else:
+        assert [r["translatedText"] for r in results] == [f"[en] {t}" for t in texts]
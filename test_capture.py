@@ -0,0 +1,124 @@
+import sys
+import threading
+import types
+
+import numpy as np
+import pytest
+
+import capture
+from capture import MonitorTopology, SyntheticBackend
+
+LAYOUT = [
+    {'left': 0, 'top': 0, 'width': 64, 'height': 48},
+    {'left': 64, 'top': 0, 'width': 32, 'height': 24},
+]
+
+
+class Counter:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return [dict(m) for m in self.result]
+
+
+def test_topology_requeries_only_on_signature_change():
+    query, state = Counter(LAYOUT), {"signature": 1}
+    topology = MonitorTopology(query=query, signature=lambda: state["signature"], ttl=0)
+    assert topology.monitors() == LAYOUT
+    assert topology.monitors() == LAYOUT
+    assert query.calls == 1
+    state["signature"] = 2
+    query.result = LAYOUT[:1]
+    assert topology.monitors() == LAYOUT[:1]
+    assert query.calls == 2
+
+
+def test_topology_ttl_without_signature(monkeypatch):
+    clock = {"now": 100.0}
+    monkeypatch.setattr(capture.time, "time", lambda: clock["now"])
+    query = Counter(LAYOUT)
+    topology = MonitorTopology(query=query, signature=lambda: None, ttl=5)
+    topology.monitors()
+    clock["now"] += 4
+    topology.monitors()
+    assert query.calls == 1
+    clock["now"] += 2
+    topology.monitors()
+    assert query.calls == 2
+
+
+def test_topology_invalidate_and_fallback(monkeypatch):
+    monkeypatch.setattr(capture.config, "CAPTURE_FALLBACK_GEOMETRY", dict(LAYOUT[0]))
+    query = Counter([])
+    topology = MonitorTopology(query=query, signature=lambda: 1, ttl=60)
+    assert topology.monitors() == [LAYOUT[0]]
+    topology.invalidate()
+    topology.monitors()
+    assert query.calls == 2
+
+
+def test_synthetic_grab_and_cursor():
+    frames = [np.full((m['height'], m['width'], 3), i + 1, dtype=np.uint8) for i, m in enumerate(LAYOUT)]
+    backend = SyntheticBackend(LAYOUT, frames, cursor=(70, 10))
+    assert backend.monitor_geometry() == LAYOUT[1]
+    backend.cursor = None
+    assert backend.monitor_geometry() == LAYOUT[0]
+
+    view = backend.grab((66, 2, 76, 12))
+    assert view.shape == (10, 10, 3)
+    assert (view == 2).all()
+    assert not view.flags.writeable
+    assert backend.grab((500, 500, 510, 510)) is None
+
+
+def test_synthetic_hotplug_and_capture_all():
+    backend = SyntheticBackend(LAYOUT)
+    shots = capture.capture_all_monitors(backend)
+    assert [geometry for _, geometry in shots] == LAYOUT
+    assert [frame.shape for frame, _ in shots] == [(48, 64, 3), (24, 32, 3)]
+
+    backend.set_layout(LAYOUT[:1])
+    assert backend.monitors() == LAYOUT[:1]
+    assert len(capture.capture_all_monitors(backend)) == 1
+
+
+@pytest.fixture
+def fake_mss(monkeypatch):
+    # Stand-in for the mss package: every grab returns a BGRA shot filled with a counter
+    class Shot:
+        def __init__(self, width, height, value):
+            self.width, self.height = width, height
+            self.raw = bytearray([value % 256]) * (width * height * 4)
+
+    class Sct:
+        count = 0
+
+        def grab(self, monitor):
+            Sct.count += 1
+            return Shot(monitor['width'], monitor['height'], Sct.count)
+
+    monkeypatch.setitem(sys.modules, "mss", types.SimpleNamespace(mss=Sct))
+
+
+def test_mss_rings_are_per_region_and_shared_across_threads(fake_mss):
+    backend = capture.MssBackend(buffer_count=3)
+    left = (0, 0, 16, 8)
+    right = (16, 0, 32, 8)   # same size, other monitor
+
+    frames = []
+    threads = [threading.Thread(target=lambda r=r: frames.append((r, backend.grab(r)))) for r in (left, right) * 3]
+    for t in threads:
+        t.start()
+        t.join()
+
+    by_region = {}
+    for region, frame in frames:
+        by_region.setdefault(region, []).append(frame)
+    # Three grabs per region use its three buffers; no buffer serves both regions
+    ids = {region: {id(f) for f in fs} for region, fs in by_region.items()}
+    assert len(ids[left]) == 3 and len(ids[right]) == 3
+    assert not ids[left] & ids[right]
+    assert backend.grab(left) is by_region[left][0]
@@ -0,0 +1,55 @@
+import numpy as np
+
+from frame_diff import FrameDiffer
+
+
+def frame(height=256, width=512):
+    return np.zeros((height, width, 4), dtype=np.uint8)
+
+
+def bbox(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+
+def test_first_frame_and_resize_are_full():
+    differ = FrameDiffer(tile_size=64, step=2, threshold=24, full_ratio=0.6)
+    assert differ.changed_regions(frame(), []) is None
+    assert differ.changed_regions(frame(), []) == []
+    assert differ.changed_regions(frame(300, 512), []) is None
+
+
+def test_small_change_is_padded_by_one_tile():
+    differ = FrameDiffer(tile_size=64, step=2, threshold=24, full_ratio=0.6)
+    f = frame()
+    differ.changed_regions(f, [])
+    f = f.copy()
+    f[140:150, 300:310, :3] = 255
+    assert differ.changed_regions(f, []) == [(192, 64, 384, 256)]
+
+
+def test_changes_below_threshold_are_ignored():
+    differ = FrameDiffer(tile_size=64, step=2, threshold=24, full_ratio=0.6)
+    f = frame()
+    differ.changed_regions(f, [])
+    f = f.copy()
+    f[:, :, :3] = 8
+    assert differ.changed_regions(f, []) == []
+
+
+def test_region_grows_to_touching_boxes():
+    differ = FrameDiffer(tile_size=64, step=2, threshold=24, full_ratio=0.6)
+    f = frame()
+    differ.changed_regions(f, [])
+    f = f.copy()
+    f[10:20, 10:20, :3] = 255
+    previous = [{"bbox": bbox(100, 100, 300, 120)}, {"bbox": bbox(400, 200, 500, 220)}]
+    assert differ.changed_regions(f, previous) == [(0, 0, 300, 128)]
+
+
+def test_large_change_falls_back_to_full_frame():
+    differ = FrameDiffer(tile_size=64, step=2, threshold=24, full_ratio=0.6)
+    f = frame()
+    differ.changed_regions(f, [])
+    f = f.copy()
+    f[:200, :, :3] = 255
+    assert differ.changed_regions(f, []) is None
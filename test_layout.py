@@ -0,0 +1,53 @@
+import pytest
+
+import config
+from layout import group_blocks
+
+
+def item(x0, y0, x1, y1, text="ab"):
+    return {"bbox": [[x0, y0], [x1, y0], [x1, y1], [x0, y1]], "text": text}
+
+
+@pytest.fixture(autouse=True)
+def layout_config(monkeypatch):
+    monkeypatch.setattr(config, "LAYOUT_MERGE_ENABLED", True)
+    monkeypatch.setattr(config, "LAYOUT_LINE_GAP", 0.8)
+    monkeypatch.setattr(config, "LAYOUT_SIZE_RATIO", 1.6)
+    monkeypatch.setattr(config, "LAYOUT_VERTICAL_ASPECT", 1.5)
+
+
+def test_stacked_lines_form_one_block_in_reading_order():
+    data = [item(10, 45, 200, 65), item(10, 10, 220, 30), item(10, 80, 150, 100)]
+    assert group_blocks(data) == [[1, 0, 2]]
+
+
+def test_distant_lines_stay_apart():
+    data = [item(10, 10, 200, 30), item(10, 200, 200, 220), item(400, 10, 600, 30)]
+    assert group_blocks(data) == [[0], [2], [1]]
+
+
+def test_gap_and_size_limits():
+    # 20 px lines: a 15 px gap merges, a 17 px gap doesn't, nor does a much taller line
+    data = [item(0, 0, 100, 20), item(0, 35, 100, 55), item(0, 72, 100, 92), item(0, 107, 100, 167)]
+    assert group_blocks(data) == [[0, 1], [2], [3]]
+
+
+def test_lines_without_horizontal_overlap_stay_apart():
+    data = [item(0, 0, 100, 20), item(150, 25, 250, 45)]
+    assert group_blocks(data) == [[0], [1]]
+
+
+def test_vertical_columns_read_right_to_left():
+    data = [item(100, 0, 120, 200, "abcd"), item(130, 0, 150, 200, "efgh"), item(300, 0, 320, 200, "ijkl")]
+    assert group_blocks(data) == [[1, 0], [2]]
+
+
+def test_vertical_and_horizontal_never_merge():
+    data = [item(0, 0, 20, 100, "abcd"), item(0, 105, 100, 125)]
+    assert group_blocks(data) == [[0], [1]]
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(config, "LAYOUT_MERGE_ENABLED", False)
+    data = [item(10, 10, 200, 30), item(10, 35, 200, 55)]
+    assert group_blocks(data) == [[0], [1]]
@@ -0,0 +1,36 @@
+import json
+
+from local_translator import DictionaryTranslator, load_dictionary
+
+
+def test_whole_line_match():
+    d = DictionaryTranslator({"hello world": "hi"}, paths=[])
+    assert d.translate_text("hello  world ") == "hi"
+
+
+def test_greedy_longest_match():
+    d = DictionaryTranslator({"ab": "AB", "abc": "ABC", "d": "D", "cd": "CD"}, paths=[])
+    assert d.translate_text("abcd") == "ABC D"
+    assert d.translate_text("ab cd") == "AB CD"
+
+
+def test_uncovered_text_is_none():
+    d = DictionaryTranslator({"ab": "AB"}, paths=[])
+    assert d.translate_text("abx") is None
+    assert d.translate_text("") is None
+    assert d.translate(["ab", "zz"]) == [{"translatedText": "AB"}, {"translatedText": None}]
+
+
+def test_load_dictionary_formats(tmp_path):
+    (tmp_path / "a.json").write_text(json.dumps([{"source": "x", "translation": "X"}]), encoding="utf-8")
+    (tmp_path / "b.tsv").write_text("y\tY\nbad\n", encoding="utf-8")
+    (tmp_path / "c.csv").write_text("z,Z\n", encoding="utf-8")
+    paths = [str(tmp_path / n) for n in ("a.json", "b.tsv", "c.csv", "missing.json")]
+    assert load_dictionary(paths) == {"x": "X", "y": "Y", "z": "Z"}
+
+
+def test_passed_entries_override_files(tmp_path):
+    path = tmp_path / "a.tsv"
+    path.write_text("x\tfile\n", encoding="utf-8")
+    d = DictionaryTranslator({"x": "memory"}, paths=[str(path)])
+    assert d.translate_text("x") == "memory"
@@ -0,0 +1,37 @@
+import config
+from ocr_pool import _TileSet, make_tiles, merge_tile_results
+
+
+def result(x0, y0, x1, y1, text, confidence=0.9):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]], text, confidence
+
+
+def test_make_tiles_overlap_and_origin():
+    assert make_tiles(200, 100, 2, 1, 20, origin=(10, 5)) == [(10, 5, 130, 105), (90, 5, 210, 105)]
+
+
+def test_seam_duplicate_keeps_uncut_copy(monkeypatch):
+    monkeypatch.setattr(config, "OCR_POOL_DEDUPE_OVERLAP", 0.5)
+    tiles = _TileSet(make_tiles(200, 100, 2, 1, 20), (0, 0, 200, 100))
+    whole = result(60, 40, 115, 55, "whole")
+    cut = result(80, 40, 115, 55, "cut", confidence=0.99)
+    right = result(150, 10, 190, 25, "right")
+    merged = merge_tile_results([[whole], [cut, right]], tiles)
+    assert [text for _, text, _ in merged] == ["right", "whole"]
+
+
+def test_outer_frame_edge_is_not_a_seam(monkeypatch):
+    monkeypatch.setattr(config, "OCR_POOL_DEDUPE_OVERLAP", 0.5)
+    tiles = _TileSet(make_tiles(200, 100, 2, 1, 20), (0, 0, 200, 100))
+    # Touches the frame's left edge, and is read only once
+    edge = result(0, 40, 30, 55, "edge")
+    assert merge_tile_results([[edge], []], tiles) == [edge]
+
+
+def test_distinct_lines_in_the_overlap_both_survive(monkeypatch):
+    monkeypatch.setattr(config, "OCR_POOL_DEDUPE_OVERLAP", 0.5)
+    tiles = _TileSet(make_tiles(200, 100, 2, 1, 20), (0, 0, 200, 100))
+    top = result(85, 10, 110, 20, "top")
+    bottom = result(85, 30, 110, 40, "bottom")
+    merged = merge_tile_results([[top, bottom], [top, bottom]], tiles)
+    assert [text for _, text, _ in merged] == ["top", "bottom"]
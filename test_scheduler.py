@@ -0,0 +1,95 @@
+import threading
+import time
+
+from scheduler import RefreshScheduler
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_requests_while_queued_coalesce():
+    started, release, runs = threading.Event(), threading.Event(), []
+
+    def job(token):
+        runs.append(token.generation)
+        started.set()
+        release.wait()
+
+    scheduler = RefreshScheduler(job)
+    scheduler.request()
+    assert started.wait(2)
+    # The first job is running; these three collapse into one queued run
+    for _ in range(3):
+        scheduler.request()
+    release.set()
+    assert wait_until(lambda: len(runs) == 2 and not scheduler.busy)
+    time.sleep(0.05)
+    assert len(runs) == 2
+    assert scheduler.requests == 4
+    assert scheduler.coalesced == 2
+    scheduler.stop()
+
+
+def test_newer_request_supersedes_running_job():
+    started, calls, finished = threading.Event(), [], []
+
+    def job(token):
+        calls.append(token.generation)
+        started.set()
+        if len(calls) == 1:
+            while not token.cancelled:
+                time.sleep(0.005)
+        token.check()
+        finished.append(token.generation)
+
+    scheduler = RefreshScheduler(job)
+    scheduler.request()
+    assert started.wait(2)
+    scheduler.request()
+    assert wait_until(lambda: finished == [2] and not scheduler.busy)
+    assert calls == [1, 2]
+    assert scheduler.superseded == 1
+    scheduler.stop()
+
+
+def test_cancel_wait_blocks_until_job_returns():
+    started, state = threading.Event(), {"done": False}
+
+    def job(token):
+        started.set()
+        time.sleep(0.2)   # e.g. inside OCR, before the next check()
+        state["done"] = True
+        token.check()
+
+    scheduler = RefreshScheduler(job)
+    scheduler.request()
+    assert started.wait(2)
+    scheduler.cancel(wait=True)
+    assert state["done"]
+    assert not scheduler.busy
+    scheduler.stop()
+
+
+def test_cancel_drops_queued_request():
+    runs = []
+    release = threading.Event()
+
+    def job(token):
+        runs.append(token.generation)
+        release.wait()
+        token.check()
+
+    scheduler = RefreshScheduler(job)
+    scheduler.request()
+    assert wait_until(lambda: runs)
+    scheduler.request()
+    scheduler.cancel()
+    release.set()
+    assert wait_until(lambda: not scheduler.busy)
+    time.sleep(0.05)
+    assert runs == [1]
+    scheduler.stop()
@@ -0,0 +1,47 @@
+import random
+import re
+
+from script_filter import JAPANESE_RANGES, japanese_mask
+
+# The per-string filter japanese_mask replaced
+_OLD_RE = re.compile("[" + "".join(f"{chr(lo)}-{chr(hi)}" for lo, hi in JAPANESE_RANGES) + "]")
+
+
+def old_is_japanese(text):
+    if not text:
+        return False
+    jp_chars = _OLD_RE.findall(text)
+    ratio = len(jp_chars) / len(text) if len(text) > 0 else 0
+    return len(jp_chars) >= 2 and ratio >= 0.5
+
+
+def test_old_regex_ranges():
+    assert _OLD_RE.pattern == "[" + chr(0x3040) + "-" + chr(0x30FF) + chr(0x3400) + "-" + chr(0x4DBF) \
+        + chr(0x4E00) + "-" + chr(0x9FFF) + "]"
+
+
+def test_matches_old_filter_on_samples():
+    texts = [
+        "", None, "a", "hello", chr(0x3042), chr(0x3042) * 2,
+        chr(0x3042) + chr(0x4E00) + "ab", chr(0x3042) + chr(0x4E00) + "abc",
+        "HP" + chr(0x30C6) + chr(0x30B9) + chr(0x30C8),
+        chr(0x1F600) + chr(0x3042) + chr(0x3044),        # astral code point
+        chr(0xFF21) + chr(0x3042) + chr(0x3044),         # full-width latin
+        chr(0x303F) + chr(0x3040) + chr(0x30FF) + chr(0x3100),
+        chr(0x4DBF) + chr(0x4DC0) + chr(0x9FFF) + chr(0xA000),
+    ]
+    assert japanese_mask(texts).tolist() == [old_is_japanese(t) for t in texts]
+
+
+def test_matches_old_filter_on_random_strings():
+    rng = random.Random(0)
+    # Code points around every range edge, plus ASCII and astral characters
+    pool = [0x20, 0x41, 0x61, 0x1F600, 0x10000]
+    for lo, hi in JAPANESE_RANGES:
+        pool += [lo - 1, lo, lo + 1, hi - 1, hi, hi + 1]
+    texts = ["".join(chr(rng.choice(pool)) for _ in range(rng.randint(0, 8))) for _ in range(2000)]
+    assert japanese_mask(texts).tolist() == [old_is_japanese(t) for t in texts]
+
+
+def test_empty_list():
+    assert japanese_mask([]).tolist() == []
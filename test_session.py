@@ -0,0 +1,73 @@
+import numpy as np
+
+from session import SessionReader, SessionWriter
+
+GEOMETRY = {'left': 0, 'top': 0, 'width': 32, 'height': 16}
+
+
+def item(text, translation, item_id):
+    return {"bbox": [[np.int32(1), 2], [10, 2], [10, np.float32(8.5)], [1, 8]], "text": text,
+            "confidence": np.float64(0.9), "translation": translation, "id": item_id, "line_hash": 123}
+
+
+def frame(value):
+    f = np.zeros((16, 32, 4), dtype=np.uint8)
+    f[4:8, 4:20] = value
+    return f
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "session")
+    writer = SessionWriter(path)
+    writer.append([item("a", "A", 1)], GEOMETRY, SessionWriter.hold_frame(frame(50)), trace_id=7)
+    writer.append([item("b", "B", 2)], GEOMETRY, SessionWriter.hold_frame(frame(50)))   # same frame again
+    writer.append([], GEOMETRY, SessionWriter.hold_frame(frame(200)))
+    writer.append([item("c", None, 3)], GEOMETRY)
+    writer.close()
+
+    reader = SessionReader(path)
+    try:
+        assert len(reader) == 4
+        first = reader.snapshot(0)
+        assert first.trace_id == 7
+        assert first.geometry == GEOMETRY
+        assert first.data == [{"bbox": [[1, 2], [10, 2], [10, 8.5], [1, 8]], "text": "a",
+                               "confidence": 0.9, "translation": "A", "id": 1}]
+        assert np.array_equal(first.frame(), frame(50))
+
+        # Identical consecutive frames are stored once
+        assert reader.snapshot(1).frame_index == first.frame_index
+        assert len(reader.frame_index) == 2
+        assert np.array_equal(reader.snapshot(2).frame(), frame(200))
+
+        last = reader.snapshot(-1)
+        assert last.index == 3
+        assert last.frame() is None
+        assert [s.data[0]["text"] for s in reader if s.data] == ["a", "b", "c"]
+    finally:
+        reader.close()
+
+
+def test_reader_picks_up_appends_and_writer_resumes(tmp_path):
+    path = str(tmp_path / "session")
+    writer = SessionWriter(path)
+    writer.append([item("a", "A", 1)], GEOMETRY, SessionWriter.hold_frame(frame(1)))
+    writer.flush()
+
+    reader = SessionReader(path)
+    try:
+        assert len(reader) == 1
+        writer.append([item("b", "B", 2)], GEOMETRY)
+        writer.close()
+        reader.refresh()
+        assert len(reader) == 2
+
+        resumed = SessionWriter(path)
+        resumed.append([item("c", "C", 3)], GEOMETRY, SessionWriter.hold_frame(frame(2)))
+        resumed.close()
+        reader.refresh()
+        assert len(reader) == 3
+        assert reader.snapshot(2).frame_index == 1
+        assert np.array_equal(reader.snapshot(2).frame(), frame(2))
+    finally:
+        reader.close()
@@ -0,0 +1,42 @@
+import random
+
+import pygame
+
+from spatial_index import RectIndex, bboxes_to_rects
+
+
+def test_query_point_matches_collidepoint():
+    rng = random.Random(0)
+    rects = [(rng.randint(0, 900), rng.randint(0, 700), rng.randint(0, 200), rng.randint(0, 80)) for _ in range(200)]
+    index = RectIndex(rects, cell_size=64)
+    for _ in range(2000):
+        x, y = rng.randint(-10, 1200), rng.randint(-10, 900)
+        expected = [i for i, r in enumerate(rects) if pygame.Rect(r).collidepoint(x, y)]
+        assert index.query_point(x, y) == expected
+
+
+def test_query_point_edges():
+    index = RectIndex([(10, 10, 20, 20), (25, 25, 10, 10)], cell_size=16)
+    assert index.query_point(10, 10) == [0]
+    assert index.query_point(29, 29) == [0, 1]
+    assert index.query_point(30, 30) == [1]
+    assert index.query_point(35, 35) == []
+    assert index.query_point(5, 5) == []
+
+
+def test_empty_index():
+    index = RectIndex([])
+    assert len(index) == 0
+    assert index.query_point(0, 0) == []
+
+
+def test_bboxes_to_rects():
+    rects = bboxes_to_rects([[[10.7, 5.2], [50.9, 5.2], [50.9, 25.8], [10.7, 25.8]]])
+    assert [tuple(r) for r in rects.tolist()] == [(10, 5, 40, 20)]
+
+
+def test_overlap_area_exclude():
+    index = RectIndex([(0, 0, 100, 20), (0, 30, 100, 20)], cell_size=16)
+    assert index.overlap_area(10, 10, 20, 30) == 10 * 20 + 10 * 20
+    assert index.overlap_area(10, 10, 20, 30, exclude=0) == 10 * 20
+    assert index.overlap_area(10, 0, 20, 10, exclude=0) == 0
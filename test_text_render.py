@@ -0,0 +1,54 @@
+import random
+
+import pygame
+import pytest
+
+from text_render import GlyphAtlas
+
+FONT = "assets/fonts/PressStart2P-Regular.ttf"
+
+
+@pytest.fixture(scope="module", params=[10, 18, 24])
+def atlas(request):
+    pygame.font.init()
+    return GlyphAtlas(FONT, request.param)
+
+
+def old_wrap(font, text, max_width):
+    # The overlay's wrap before the glyph atlas, measuring with font.size
+    words = text.split(" ")
+    lines = []
+    current = ""
+    for word in words:
+        test = current + (" " if current else "") + word
+        if font.size(test)[0] <= max_width:
+            current = test
+        else:
+            lines.append(current)
+            current = word
+    if current:
+        lines.append(current)
+    return lines
+
+
+def random_texts(count=300):
+    rng = random.Random(0)
+    words = ["fi", "fl", "if", "ffi", "file", "flag", "abh", "gggf", "b", "", "Tj", "AV", "..."]
+    return [" ".join(rng.choice(words) + rng.choice("abcfhijl ") for _ in range(rng.randint(1, 12)))
+            for _ in range(count)]
+
+
+def test_size_matches_font_size(atlas):
+    for text in random_texts() + ["fi", "ffi", "fl fl", "", " "]:
+        assert atlas.size(text)[0] == atlas.font.size(text)[0], text
+
+
+def test_wrap_matches_old_wrap(atlas):
+    for text in random_texts() + ["abh  aabjc ifie fhdj b fcba fgfea gggf fh"]:
+        for width in (120, 250, 380):
+            assert atlas.wrap(text, width) == old_wrap(atlas.font, text, width), (text, width)
+
+
+def test_render_matches_font_render_size(atlas):
+    for text in ("file", "a fi b", "Tj"):
+        assert atlas.render(text, (255, 255, 255)).get_size() == atlas.font.render(text, True, (255, 255, 255)).get_size()
@@ -0,0 +1,78 @@
+import numpy as np
+
+from tracker import TextTracker, iou, line_hash
+
+
+def item(x0, y0, x1, y1, text, translation=None):
+    return {"bbox": [[x0, y0], [x1, y0], [x1, y1], [x0, y1]], "text": text, "translation": translation}
+
+
+def tracker():
+    return TextTracker(min_iou=0.3, min_similarity=0.6, stable_iou=0.8, max_missed=1)
+
+
+def test_iou():
+    assert iou((0, 0, 10, 10), (0, 0, 10, 10)) == 1.0
+    assert iou((0, 0, 10, 10), (5, 0, 15, 10)) == 50 / 150
+    assert iou((0, 0, 10, 10), (10, 0, 20, 10)) == 0.0
+
+
+def test_ids_carry_over_and_new_lines_get_new_ids():
+    t = tracker()
+    first = t.update([item(0, 0, 100, 20, "hello"), item(0, 50, 100, 70, "world")])
+    second = t.update([item(0, 50, 100, 70, "world"), item(0, 100, 100, 120, "new line")])
+    assert second[0]["id"] == first[1]["id"]
+    assert second[1]["id"] not in (first[0]["id"], first[1]["id"])
+
+
+def test_jitter_keeps_box_and_translation():
+    t = tracker()
+    first = t.update([item(0, 0, 100, 20, "hello")])
+    first[0]["translation"] = "HELLO"
+    t.remember_translations(first)
+
+    second = t.update([item(1, 1, 101, 21, "hello")])
+    assert second[0]["id"] == first[0]["id"]
+    assert second[0]["bbox"] == first[0]["bbox"]
+    assert second[0]["translation"] == "HELLO"
+
+
+def test_edited_text_keeps_id_but_not_translation():
+    t = tracker()
+    first = t.update([item(0, 0, 100, 20, "hello world")])
+    first[0]["translation"] = "HELLO WORLD"
+    t.remember_translations(first)
+
+    second = t.update([item(0, 0, 100, 20, "hello world!")])
+    assert second[0]["id"] == first[0]["id"]
+    assert second[0]["translation"] is None
+
+
+def test_unrelated_text_at_same_place_is_a_new_line():
+    t = tracker()
+    first = t.update([item(0, 0, 100, 20, "hello")])
+    second = t.update([item(0, 0, 100, 20, "zzzzzzzz")])
+    assert second[0]["id"] != first[0]["id"]
+
+
+def test_missed_line_keeps_id_for_max_missed_refreshes():
+    t = tracker()
+    first = t.update([item(0, 0, 100, 20, "hello")])
+    t.update([])
+    assert t.update([item(0, 0, 100, 20, "hello")])[0]["id"] == first[0]["id"]
+    t.update([])
+    t.update([])
+    assert t.update([item(0, 0, 100, 20, "hello")])[0]["id"] != first[0]["id"]
+
+
+def test_lookup_by_line_hash():
+    grey = np.zeros((40, 120), dtype=np.uint8)
+    grey[5:15, 10:90] = 200
+    fingerprint = line_hash(grey, (0, 0, 100, 20))
+    t = tracker()
+    line = item(0, 0, 100, 20, "hello")
+    line["line_hash"] = fingerprint
+    t.update([line])
+    assert t.lookup((1, 0, 101, 20), fingerprint)[1] == "hello"
+    assert t.lookup((50, 0, 150, 20), fingerprint) is None
+    assert t.lookup((0, 0, 100, 20), fingerprint + 1) is None
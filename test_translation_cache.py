@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from translation_cache import TranslationCache, normalize_text
+
+
+def test_normalize_text():
+    assert normalize_text(" Ａｂｃ \n def ") == "Abc def"
+    assert normalize_text(None) == ""
+
+
+def test_lru_eviction_and_hits():
+    cache = TranslationCache(path=None, max_entries=2)
+    cache.put("a", "ja", "en", "A")
+    cache.put("b", "ja", "en", "B")
+    assert cache.get("a", "ja", "en") == "A"   # a is now the most recent
+    cache.put("c", "ja", "en", "C")
+    assert cache.get("b", "ja", "en") is None
+    assert cache.get("a", "ja", "en") == "A"
+    assert cache.get(" c ", "ja", "en") == "C"
+    assert cache.get("c", "ja", "de") is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (2, 3, 2)
+
+
+def test_save_and_load_keep_lru_order(tmp_path):
+    path = str(tmp_path / "sub" / "cache.json")
+    cache = TranslationCache(path=path, max_entries=3)
+    for text in "abcd":
+        cache.put(text, "ja", "en", text.upper())
+    cache.get("b", "ja", "en")
+    cache.save()
+
+    loaded = TranslationCache(path=path, max_entries=2)
+    assert list(loaded.entries) == ["ja|en|d", "ja|en|b"]
+    assert loaded.get("b", "ja", "en") == "B"
+
+
+@pytest.mark.parametrize("content", [
+    "not json",
+    json.dumps({"ja|en|a": "A"}),
+    json.dumps([["ja|en|a", "A"], "oops"]),
+    json.dumps([["ja|en|a", "A", "extra"]]),
+    json.dumps([[1, 2]]),
+])
+def test_bad_cache_file_is_ignored(tmp_path, content):
+    path = tmp_path / "cache.json"
+    path.write_text(content, encoding="utf-8")
+    cache = TranslationCache(path=str(path))
+    assert len(cache.entries) == 0
+    cache.put("a", "ja", "en", "A")
+    cache.save()
+    assert TranslationCache(path=str(path)).get("a", "ja", "en") == "A"
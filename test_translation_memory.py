@@ -0,0 +1,56 @@
+import pytest
+
+import config
+from translation_memory import TranslationMemory
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    monkeypatch.setattr(config, "TRANSLATION_MEMORY_IMPORTS", [])
+    return TranslationMemory(path=None, threshold=0.85, min_chars=4)
+
+
+def jp(*codepoints):
+    return "".join(chr(c) for c in codepoints)
+
+
+# "konnichiha sekai desu" and a one-character misreading of it
+LINE = jp(0x3053, 0x3093, 0x306B, 0x3061, 0x306F, 0x4E16, 0x754C, 0x3067, 0x3059)
+MISREAD = jp(0x3053, 0x3093, 0x306B, 0x3061, 0x306F, 0x4E16, 0x9593, 0x3067, 0x3059)
+
+
+def test_exact_match(memory):
+    memory.add(LINE, "ja", "en", "Hello, world")
+    assert memory.lookup(LINE, "ja", "en") == ("Hello, world", 1.0)
+
+
+def test_near_match_within_threshold(memory):
+    memory.add(LINE, "ja", "en", "Hello, world")
+    translation, score = memory.lookup(MISREAD, "ja", "en")
+    assert translation == "Hello, world"
+    assert score == pytest.approx(1 - 1 / 9)
+
+
+def test_too_different(memory):
+    memory.add(LINE, "ja", "en", "Hello, world")
+    assert memory.lookup(LINE[:5] + jp(0x5C71, 0x5DDD, 0x3060, 0x3088), "ja", "en") is None
+
+
+def test_confusables_fold_to_exact(memory):
+    # Katakana long-vowel mark read as the kanji for one
+    memory.add(jp(0x30B2, 0x30FC, 0x30E0, 0x30AA, 0x30FC, 0x30D0), "ja", "en", "Game over")
+    assert memory.lookup(jp(0x30B2, 0x4E00, 0x30E0, 0x30AA, 0x30FC, 0x30D0), "ja", "en") == ("Game over", 1.0)
+
+
+def test_short_lines_and_other_languages_miss(memory):
+    memory.add(LINE, "ja", "en", "Hello, world")
+    memory.add(LINE[:3], "ja", "en", "Hello")
+    assert memory.lookup(LINE[:3], "ja", "en") is None
+    assert memory.lookup(LINE, "ja", "de") is None
+    assert memory.stats()["hits"] == 0
+
+
+def test_best_candidate_wins(memory):
+    memory.add(LINE, "ja", "en", "Hello, world")
+    memory.add(MISREAD, "ja", "en", "Hello, everyone")
+    assert memory.lookup(MISREAD, "ja", "en") == ("Hello, everyone", 1.0)
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+import config
+import translator
+from local_translator import DictionaryTranslator
+from translation_cache import TranslationCache
+
+
+class StubClient:
+    def __init__(self, delay=0.0, prefix="primary", error=None):
+        self.delay = delay
+        self.prefix = prefix
+        self.error = error
+        self.calls = []
+
+    def translate(self, texts, source_language="ja", target_language="en"):
+        self.calls.append(list(texts))
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [{"translatedText": f"{self.prefix}: {t}"} for t in texts]
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    # Fresh cache and client table; nothing touches the files under cache/
+    monkeypatch.setattr(translator, "translation_cache", TranslationCache(path=None))
+    monkeypatch.setattr(translator, "_memory", None)
+    monkeypatch.setattr(translator, "_memory_ready", True)
+    monkeypatch.setattr(translator, "_clients", {})
+    monkeypatch.setattr(config, "TRANSLATE_FALLBACK", "local")
+    monkeypatch.setattr(config, "TRANSLATE_FALLBACK_TIMEOUT", 0.1)
+
+    def install(primary, fallback):
+        translator.set_client(primary)
+        translator.set_client(fallback, "local")
+    return install
+
+
+def wait_for_cache(text, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        cached = translator.translation_cache.get(text, "ja", "en")
+        if cached is not None:
+            return cached
+        time.sleep(0.01)
+    return None
+
+
+def test_fast_primary_is_cached(clients):
+    clients(StubClient(), DictionaryTranslator({}, paths=[]))
+    assert translator.translate_batch(["a", "b"]) == ["primary: a", "primary: b"]
+    assert translator.translation_cache.get("a", "ja", "en") == "primary: a"
+
+
+def test_slow_primary_waits_when_fallback_has_no_answer(clients):
+    clients(StubClient(delay=0.3), DictionaryTranslator({}, paths=[]))
+    results = translator.translate_batch(["a", "b"])
+    assert results == ["primary: a", "primary: b"]
+    assert not any(getattr(r, "provisional", False) for r in results)
+
+
+def test_slow_primary_shows_fallback_then_caches_late_answer(clients):
+    clients(StubClient(delay=0.3), DictionaryTranslator({"a": "fallback a", "b": "fallback b"}, paths=[]))
+    results = translator.translate_batch(["a", "b"])
+    assert results == ["fallback a", "fallback b"]
+    assert all(r.provisional for r in results)
+    assert wait_for_cache("a") == "primary: a"
+
+
+def test_failing_primary_uses_fallback(clients):
+    clients(StubClient(error=RuntimeError("offline")), DictionaryTranslator({"a": "fallback a"}, paths=[]))
+    assert translator.translate_batch(["a", "b"]) == ["fallback a", "[error]"]
+    assert translator.translation_cache.get("a", "ja", "en") is None
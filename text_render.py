@@ -0,0 +1,164 @@
+from collections import OrderedDict
+
+import pygame
+
+import config
+
+
+class GlyphAtlas:
+    # Glyph surfaces and advances for one font, each rasterized once on first
+    # use. Strings are measured from the advances and drawn by blitting
+    # glyphs, so no string is rendered just to be measured and outlines don't
+    # re-render the text per direction. Character pairs the font shapes
+    # differently from their two glyphs (PressStart2P has "fi" and "fl"
+    # ligatures) are drawn and measured as one unit, so this lays out exactly
+    # like font.render() and font.size().
+    def __init__(self, path, size, cache_size=config.TEXT_LAYOUT_CACHE_SIZE):
+        self.font = pygame.font.Font(path, size)
+        self.cache_size = cache_size
+        self.glyphs = {}      # (char, color) -> surface
+        self.rings = {}       # (char, color) -> surface of the glyph in the 8 neighbouring offsets
+        self.char_metrics = {}
+        self.pairs = {}       # (char, char) -> True if the font joins them
+        self.layouts = OrderedDict()
+        self.wraps = OrderedDict()
+
+    def get_height(self):
+        return self.font.get_height()
+
+    def _remember(self, cache, key, value):
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+    def metrics(self, char):
+        # (advance, top, bottom) relative to the baseline. font.render() sizes
+        # a string from the tallest/lowest glyph in it, so glyphs are placed
+        # by these extents rather than stacked at y=0.
+        m = self.char_metrics.get(char)
+        if m is None:
+            ascent, descent = self.font.get_ascent(), self.font.get_descent()
+            glyph = self.font.metrics(char) if len(char) == 1 else None
+            if len(char) > 1:
+                # A joined pair: its shaped width, and the extents of both characters
+                parts = [self.metrics(c) for c in char]
+                m = (self.font.size(char)[0], max(p[1] for p in parts), min(p[2] for p in parts))
+            elif glyph and glyph[0]:
+                minx, maxx, miny, maxy, adv = glyph[0]
+                m = (adv, max(ascent, maxy), min(descent, miny))
+            else:
+                width, height = self.font.size(char)
+                m = (width, ascent, ascent - height)
+            self.char_metrics[char] = m
+        return m
+
+    def advance(self, char):
+        return self.metrics(char)[0]
+
+    def _joins(self, a, b):
+        joined = self.pairs.get((a, b))
+        if joined is None:
+            joined = self.pairs[(a, b)] = self.font.size(a + b)[0] != self.advance(a) + self.advance(b)
+        return joined
+
+    def units(self, text):
+        # The text split into single characters and joined pairs, left to right
+        units, i = [], 0
+        while i < len(text):
+            if i + 1 < len(text) and self._joins(text[i], text[i + 1]):
+                units.append(text[i:i + 2])
+                i += 2
+            else:
+                units.append(text[i])
+                i += 1
+        return units
+
+    def width(self, text):
+        return sum(self.advance(u) for u in self.units(text))
+
+    def glyph(self, char, color):
+        surf = self.glyphs.get((char, color))
+        if surf is None:
+            surf = self.glyphs[(char, color)] = self.font.render(char, True, color)
+        return surf
+
+    def ring(self, char, color):
+        surf = self.rings.get((char, color))
+        if surf is None:
+            glyph = self.glyph(char, color)
+            surf = pygame.Surface((glyph.get_width() + 2, glyph.get_height() + 2), pygame.SRCALPHA)
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    if dx != 0 or dy != 0:
+                        surf.blit(glyph, (1 + dx, 1 + dy))
+            self.rings[(char, color)] = surf
+        return surf
+
+    def layout(self, text):
+        # (width, height, top): the string's size and its top edge above the baseline
+        entry = self.layouts.get(text)
+        if entry is not None:
+            self.layouts.move_to_end(text)
+            return entry
+        if not text:
+            return self._remember(self.layouts, text, (0, self.get_height(), self.font.get_ascent()))
+        width, top, bottom = 0, None, None
+        for c in self.units(text):
+            adv, t, b = self.metrics(c)
+            width += adv
+            top = t if top is None else max(top, t)
+            bottom = b if bottom is None else min(bottom, b)
+        return self._remember(self.layouts, text, (width, top - bottom, top))
+
+    def size(self, text):
+        return self.layout(text)[:2]
+
+    def _blit_glyphs(self, surface, text, pos, lookup):
+        x, y = pos
+        top = self.layout(text)[2]
+        for c in self.units(text):
+            adv, t, _ = self.metrics(c)
+            surface.blit(lookup(c), (x, y + top - t))
+            x += adv
+
+    def draw(self, surface, text, pos, color):
+        self._blit_glyphs(surface, text, pos, lambda c: self.glyph(c, color))
+
+    def render(self, text, color):
+        surf = pygame.Surface(self.size(text), pygame.SRCALPHA)
+        self.draw(surf, text, (0, 0), color)
+        return surf
+
+    def render_outlined(self, text, color, outline_color):
+        # All outline rings first, then the glyphs on top, like blitting the
+        # whole string eight times in the outline colour and once in colour
+        width, height = self.size(text)
+        surf = pygame.Surface((width + 2, height + 2), pygame.SRCALPHA)
+        self._blit_glyphs(surf, text, (0, 0), lambda c: self.ring(c, outline_color))
+        self.draw(surf, text, (1, 1), color)
+        return surf
+
+    def wrap(self, text, max_width):
+        # Greedy word wrap in one pass: line widths are running sums of word
+        # advances, never re-measured
+        key = (text, max_width)
+        lines = self.wraps.get(key)
+        if lines is not None:
+            self.wraps.move_to_end(key)
+            return lines
+
+        space = self.advance(" ")
+        lines, current, current_w = [], "", 0
+        for word in text.split(" "):
+            word_w = self.width(word)
+            test_w = current_w + (space if current else 0) + word_w
+            if test_w <= max_width:
+                current = current + " " + word if current else word
+                current_w = test_w
+            else:
+                lines.append(current)
+                current, current_w = word, word_w
+        if current:
+            lines.append(current)
+        return self._remember(self.wraps, key, lines)
@@ -0,0 +1,141 @@
+import itertools
+import threading
+import zlib
+from difflib import SequenceMatcher
+
+import config
+from frame_diff import bbox_bounds
+from translation_cache import normalize_text
+
+
+def iou(a, b):
+    iw = min(a[2], b[2]) - max(a[0], b[0])
+    ih = min(a[3], b[3]) - max(a[1], b[1])
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union else 0.0
+
+
+def line_hash(grey, bounds):
+    # Fingerprint of a line's pixels, used to skip re-recognising an unchanged line
+    height, width = grey.shape[:2]
+    x0, y0, x1, y1 = bounds
+    crop = grey[max(y0, 0):min(y1, height), max(x0, 0):min(x1, width)]
+    return zlib.crc32(crop.tobytes()) ^ (crop.shape[0] << 16 | crop.shape[1])
+
+
+class Track:
+    __slots__ = ("id", "bounds", "bbox", "text", "confidence", "translation", "block_text", "line_hash", "missed")
+
+    def __init__(self, track_id, item, bounds):
+        self.id = track_id
+        self.missed = 0
+        self.update(item, bounds)
+
+    def update(self, item, bounds):
+        self.bounds = bounds
+        self.bbox = item["bbox"]
+        self.text = item["text"]
+        self.confidence = item.get("confidence")
+        self.translation = item.get("translation")
+        self.block_text = item.get("block_text")
+        self.line_hash = item.get("line_hash")
+
+
+class TextTracker:
+    # Matches each refresh's lines to the previous ones by box IoU and text
+    # similarity. Matched lines keep their ID, their box (when it only
+    # jittered) and, if the text is unchanged, their translation, so the
+    # overlay stays still and only new or edited lines get translated.
+    def __init__(self, min_iou=config.TRACK_MIN_IOU, min_similarity=config.TRACK_MIN_SIMILARITY,
+                 stable_iou=config.TRACK_STABLE_IOU, max_missed=config.TRACK_MAX_MISSED):
+        self.min_iou = min_iou
+        self.min_similarity = min_similarity
+        self.stable_iou = stable_iou
+        self.max_missed = max_missed
+        self.tracks = []
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def reset(self):
+        with self.lock:
+            self.tracks = []
+
+    def lookup(self, bounds, fingerprint):
+        # Recognition shortcut for ocr.line_cache: a box at the same place with
+        # identical pixels reads the same as last time
+        with self.lock:
+            for track in self.tracks:
+                if track.line_hash == fingerprint and iou(track.bounds, bounds) >= self.stable_iou:
+                    return track.bbox, track.text, track.confidence
+        return None
+
+    def update(self, data):
+        with self.lock:
+            return self._update(data)
+
+    def _update(self, data):
+        bounds = [bbox_bounds(item["bbox"]) for item in data]
+        texts = [normalize_text(item["text"]) for item in data]
+
+        pairs = []
+        for i, b in enumerate(bounds):
+            for j, track in enumerate(self.tracks):
+                overlap = iou(b, track.bounds)
+                if overlap < self.min_iou:
+                    continue
+                similarity = SequenceMatcher(None, texts[i], normalize_text(track.text)).ratio()
+                if similarity >= self.min_similarity:
+                    pairs.append((overlap + similarity, i, j))
+        pairs.sort(reverse=True)
+
+        matched_items, matched_tracks = {}, set()
+        for _, i, j in pairs:
+            if i in matched_items or j in matched_tracks:
+                continue
+            matched_items[i] = j
+            matched_tracks.add(j)
+
+        tracks, reused = [], 0
+        for i, item in enumerate(data):
+            j = matched_items.get(i)
+            if j is None:
+                track = Track(next(self._ids), item, bounds[i])
+            else:
+                track = self.tracks[j]
+                same_text = texts[i] == normalize_text(track.text)
+                if same_text and iou(bounds[i], track.bounds) >= self.stable_iou:
+                    # Same line, box only jittered: keep the old box so nothing moves
+                    item["bbox"] = track.bbox
+                    bounds[i] = track.bounds
+                if same_text and item.get("translation") is None and track.translation not in (None, "[error]"):
+                    item["translation"] = track.translation
+                    if track.block_text is not None:
+                        item["block_text"] = track.block_text
+                    reused += 1
+                track.update(item, bounds[i])
+                track.missed = 0
+            item["id"] = track.id
+            tracks.append(track)
+
+        # Keep recently missed lines around so a one-frame OCR miss doesn't cost them their ID
+        for j, track in enumerate(self.tracks):
+            if j not in matched_tracks and track.missed < self.max_missed:
+                track.missed += 1
+                tracks.append(track)
+        self.tracks = tracks
+
+        print(f"[Track] {len(matched_items)}/{len(data)} lines matched, {reused} translations reused")
+        return data
+
+    def remember_translations(self, data):
+        # Called after translate so the tracks hold the latest translations
+        with self.lock:
+            by_id = {track.id: track for track in self.tracks}
+            for item in data:
+                track = by_id.get(item.get("id"))
+                if track is not None:
+                    track.translation = item.get("translation")
+                    track.block_text = item.get("block_text")
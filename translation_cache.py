@@ -0,0 +1,105 @@
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import config
+
+
+def normalize_text(text):
+    # NFKC folds full-width/half-width variants, then collapse whitespace
+    text = unicodedata.normalize("NFKC", text or "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TranslationCache:
+    def __init__(self, path=config.TRANSLATION_CACHE_PATH, max_entries=config.TRANSLATION_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self.lock = threading.Lock()
+        # Saves come from refresh threads and late translation callbacks; one
+        # at a time, since they share the temp file
+        self.save_lock = threading.Lock()
+        self.load()
+
+    def _key(self, text, source_lang, target_lang):
+        return f"{source_lang}|{target_lang}|{normalize_text(text)}"
+
+    def get(self, text, source_lang, target_lang):
+        key = self._key(text, source_lang, target_lang)
+        with self.lock:
+            translation = self.entries.get(key)
+            if translation is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return translation
+
+    def put(self, text, source_lang, target_lang, translation):
+        key = self._key(text, source_lang, target_lang)
+        with self.lock:
+            self.entries[key] = translation
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.dirty = True
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            # Stored oldest -> newest so the LRU order survives a restart
+            if not isinstance(stored, list):
+                raise ValueError(f"expected a list of entries, got {type(stored).__name__}")
+            entries = OrderedDict()
+            for entry in stored[-self.max_entries:] if self.max_entries else []:
+                if not (isinstance(entry, list) and len(entry) == 2 and isinstance(entry[0], str)
+                        and isinstance(entry[1], str)):
+                    raise ValueError(f"bad entry {entry!r:.80}")
+                entries[entry[0]] = entry[1]
+        except (OSError, ValueError) as e:
+            print(f"[Cache] Could not load {self.path}: {e}")
+            return
+
+        self.entries = entries
+        print(f"[Cache] Loaded {len(self.entries)} translations from {self.path}")
+
+    def save(self):
+        if not self.path:
+            return
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                snapshot = list(self.entries.items())
+                self.dirty = False
+
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"[Cache] Could not save {self.path}: {e}")
@@ -0,0 +1,254 @@
+import argparse
+import csv
+import json
+import os
+import threading
+from collections import Counter, OrderedDict
+
+import config
+from translation_cache import normalize_text
+
+
+# Characters OCR routinely confuses, folded together before matching only
+# (stored text is untouched): long-vowel mark vs dashes/kanji one, small vs
+# full-size kana, and katakana vs look-alike kanji.
+_CONFUSABLES = {
+    0x4E00: 0x30FC, 0x2015: 0x30FC, 0x2500: 0x30FC, 0x2212: 0x30FC, 0x2D: 0x30FC,
+    0x529B: 0x30AB, 0x53E3: 0x30ED, 0x5DE5: 0x30A8, 0x4E8C: 0x30CB, 0x516B: 0x30CF,
+    0x5915: 0x30BF, 0x535C: 0x30C8, 0x30F5: 0x30AB, 0x30F6: 0x30B1,
+}
+for _small in (0x3041, 0x3043, 0x3045, 0x3047, 0x3049, 0x3063, 0x3083, 0x3085, 0x3087, 0x308E):
+    _CONFUSABLES[_small] = _small + 1
+    _CONFUSABLES[_small + 0x60] = _small + 0x61   # katakana counterpart
+
+
+def fold_text(text):
+    return normalize_text(text).translate(_CONFUSABLES)
+
+
+def ngrams(text, n=2):
+    if len(text) < n:
+        return Counter([text]) if text else Counter()
+    return Counter(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def edit_distance(a, b, limit=None):
+    # Levenshtein distance; stops early once every cell in a row exceeds limit
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def read_records(path):
+    # .json: list of {"source", "translation"[, "source_lang", "target_lang"]}
+    # .tsv/.csv: source, translation[, source_lang, target_lang] rows
+    # Missing languages are left out for the caller to default.
+    if path.endswith((".tsv", ".csv")):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = [row for row in csv.reader(f, delimiter="\t" if path.endswith(".tsv") else ",") if len(row) >= 2]
+        return [dict(zip(("source", "translation", "source_lang", "target_lang"), row)) for row in rows]
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TranslationMemory:
+    # Past (source, translation) pairs with a character n-gram index, so a
+    # line that OCR read slightly differently this time still finds the
+    # translation of its earlier reading. Candidates sharing the most n-grams
+    # are checked by edit distance on confusable-folded text.
+    def __init__(self, path=config.TRANSLATION_MEMORY_PATH, threshold=config.TRANSLATION_MEMORY_THRESHOLD,
+                 min_chars=config.TRANSLATION_MEMORY_MIN_CHARS, max_entries=config.TRANSLATION_MEMORY_MAX_ENTRIES,
+                 candidates=config.TRANSLATION_MEMORY_CANDIDATES):
+        self.path = path
+        self.threshold = threshold
+        self.min_chars = min_chars
+        self.max_entries = max_entries
+        self.candidates = candidates
+        # (source_lang, target_lang, normalized source) -> [translation, folded source, n-grams]
+        self.entries = OrderedDict()
+        self.index = {}
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()   # file writes share one temp file
+        self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, text, source_lang, target_lang, translation):
+        text = normalize_text(text)
+        if not text or not translation:
+            return
+        key = (source_lang, target_lang, text)
+        with self.lock:
+            self._add(key, translation)
+            self.dirty = True
+
+    def _add(self, key, translation):
+        if key in self.entries:
+            self.entries[key][0] = translation
+            self.entries.move_to_end(key)
+            return
+        folded = fold_text(key[2])
+        grams = ngrams(folded)
+        self.entries[key] = [translation, folded, grams]
+        for gram in grams:
+            self.index.setdefault((key[0], key[1], gram), set()).add(key)
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        _, _, grams = self.entries.pop(key)
+        for gram in grams:
+            bucket = self.index.get((key[0], key[1], gram))
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.index[(key[0], key[1], gram)]
+
+    def lookup(self, text, source_lang, target_lang):
+        # Returns (translation, score) for the closest stored source at or
+        # above the threshold, else None
+        folded = fold_text(text)
+        if len(folded) < self.min_chars:
+            return None
+        grams = ngrams(folded)
+        with self.lock:
+            shared = Counter()
+            for gram in grams:
+                for key in self.index.get((source_lang, target_lang, gram), ()):
+                    shared[key] += 1
+
+            # Lines within the edit budget can't differ by more than this in length
+            budget = int((1 - self.threshold) * len(folded) / self.threshold)
+            best, best_score = None, self.threshold
+            for key, _ in shared.most_common(self.candidates):
+                translation, other, _ = self.entries[key]
+                if abs(len(other) - len(folded)) > budget:
+                    continue
+                longest = max(len(other), len(folded))
+                distance = edit_distance(folded, other, limit=int((1 - best_score) * longest))
+                score = 1.0 - distance / longest
+                if score >= best_score:
+                    best, best_score = key, score
+
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(best)
+            return self.entries[best][0], best_score
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    # --- bulk import / export ---------------------------------------------------
+
+    def import_file(self, path, source_lang="ja", target_lang="en"):
+        records = read_records(path)
+        count = 0
+        with self.lock:
+            for record in records:
+                text = normalize_text(record.get("source"))
+                if not text or not record.get("translation"):
+                    continue
+                key = (record.get("source_lang", source_lang), record.get("target_lang", target_lang), text)
+                self._add(key, record["translation"])
+                count += 1
+            self.dirty = self.dirty or count > 0
+        print(f"[Memory] Imported {count} entries from {path}")
+        return count
+
+    def export_records(self):
+        with self.lock:
+            return [{"source": text, "translation": entry[0], "source_lang": src, "target_lang": tgt}
+                    for (src, tgt, text), entry in self.entries.items()]
+
+    def export_file(self, path, quiet=False):
+        with self.save_lock:
+            records = self.export_records()
+            folder = os.path.dirname(path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            if path.endswith((".tsv", ".csv")):
+                with open(path, "w", encoding="utf-8", newline="") as f:
+                    writer = csv.writer(f, delimiter="\t" if path.endswith(".tsv") else ",")
+                    for r in records:
+                        writer.writerow([r["source"], r["translation"], r["source_lang"], r["target_lang"]])
+            else:
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(records, f, ensure_ascii=False, indent=1)
+                os.replace(tmp_path, path)
+        if not quiet:
+            print(f"[Memory] Exported {len(records)} entries to {path}")
+        return len(records)
+
+    # --- persistence ------------------------------------------------------------
+
+    def load(self):
+        if self.path and os.path.exists(self.path):
+            try:
+                self.import_file(self.path)
+            except (OSError, ValueError, KeyError, IndexError) as e:
+                print(f"[Memory] Could not load {self.path}: {e}")
+            self.dirty = False
+        for path in config.TRANSLATION_MEMORY_IMPORTS:
+            try:
+                self.import_file(path)
+            except (OSError, ValueError, KeyError, IndexError) as e:
+                print(f"[Memory] Could not import {path}: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+        try:
+            self.export_file(self.path, quiet=True)
+        except OSError as e:
+            print(f"[Memory] Could not save {self.path}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import/export the fuzzy translation memory")
+    parser.add_argument("action", choices=["import", "export", "stats"])
+    parser.add_argument("files", nargs="*", help=".json, .tsv or .csv files")
+    parser.add_argument("--memory", default=config.TRANSLATION_MEMORY_PATH, help="memory file to update")
+    parser.add_argument("--source-lang", default="ja")
+    parser.add_argument("--target-lang", default="en")
+    args = parser.parse_args()
+
+    memory = TranslationMemory(path=args.memory)
+    if args.action == "import":
+        for path in args.files:
+            memory.import_file(path, args.source_lang, args.target_lang)
+        memory.save()
+    elif args.action == "export":
+        for path in args.files:
+            memory.export_file(path)
+    else:
+        print(f"[Memory] {len(memory)} entries in {args.memory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,317 @@
+import atexit
 import os
-from dotenv import load_dotenv
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 
-load_dotenv()
+import config
+from profiles import get_profile
+from translation_cache import TranslationCache, normalize_text
+from translation_memory import TranslationMemory
+from metrics import span
 
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 
-from google.cloud import translate_v2 as translate
-import time
+# A backend is any object with translate(texts, source_language, target_language)
+# returning [{"translatedText": str or None}, ...] in input order.
+_clients = {}
+_client_lock = threading.Lock()
+# Foreground requests get their own threads so the fallback timeout never
+# includes time queued behind background (late / fuzzy-hit) requests
+_request_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="translate-request")
+_late_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="translate-late")
+translation_cache = TranslationCache()
+# Built on first use (see get_memory): loading and indexing a large memory
+# file takes around a second and must not hold up importing this module
+_memory = None
+_memory_ready = False
+_memory_lock = threading.Lock()
+# Cache and memory files are rewritten whole, so saves run on their own thread
+_save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="translate-save")
+_save_lock = threading.Lock()
+_save_queued = False
+_memory_saved_at = 0.0
+
+class FallbackTranslation(str):
+    # A translation from the fallback backend. Callers treat it as provisional
+    # and ask again next refresh, by which time the primary's late answer is
+    # usually in the cache.
+    provisional = True
+
+class MemoryTranslation(str):
+    # A fuzzy translation-memory match for a line never translated as such.
+    # Shown straight away but provisional too: the backend's answer for the
+    # exact text is fetched in the background and replaces it next refresh.
+    provisional = True
+
+# Texts whose background request (late or fuzzy-hit) hasn't come back yet
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+def _create_google():
+    from dotenv import load_dotenv
+    load_dotenv()
+    credentials = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+    if credentials:
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials
+
+    if config.TRANSLATE_CLIENT == "async":
+        from async_translator import AsyncTranslator
+        return AsyncTranslator()
+    from google.cloud import translate_v2 as translate
+    return translate.Client()
+
+def _create_local():
+    from local_translator import LocalTranslator
+    # Exact translation-memory entries double as the offline phrasebook
+    entries = {}
+    memory = get_memory()
+    if memory is not None:
+        entries = {r["source"]: r["translation"] for r in memory.export_records()}
+    return LocalTranslator(entries)
+
+BACKENDS = {
+    "google": _create_google,
+    "local": _create_local,
+}
 
+def active_backend():
+    return get_profile().get("translate_backend") or config.TRANSLATE_BACKEND
 
-translate_client = translate.Client()
+def get_client(name=None):
+    name = name or active_backend()
+    client = _clients.get(name)
+    if client is None:
+        with _client_lock:
+            client = _clients.get(name)
+            if client is None:
+                if name not in BACKENDS:
+                    raise ValueError(f"Unknown translate backend '{name}' (available: {', '.join(BACKENDS)})")
+                start = time.time()
+                client = _clients[name] = BACKENDS[name]()
+                print(f"[Translate] {name} backend ready in {time.time() - start:.2f}s")
+    return client
+
+def set_client(client, name=None):
+    # Swap in another object with a translate(texts, source_language, target_language) method
+    with _client_lock:
+        _clients[name or active_backend()] = client
+
+def get_memory():
+    # The translation memory, or None when disabled
+    global _memory, _memory_ready
+    if not _memory_ready:
+        with _memory_lock:
+            if not _memory_ready:
+                if config.TRANSLATION_MEMORY_ENABLED:
+                    start = time.time()
+                    _memory = TranslationMemory()
+                    print(f"[Memory] Ready in {time.time() - start:.2f}s ({len(_memory)} entries)")
+                _memory_ready = True
+    return _memory
+
+def set_memory(memory):
+    # Swap in another TranslationMemory, or None to disable fuzzy matching
+    global _memory, _memory_ready
+    with _memory_lock:
+        _memory, _memory_ready = memory, True
+
+def warm_translate():
+    # Engine warmup: the translation memory, the active backend and the
+    # fallback, so a slow network never waits on the local model loading
+    get_memory()
+    client = get_client()
+    if config.TRANSLATE_FALLBACK and config.TRANSLATE_FALLBACK != active_backend():
+        get_client(config.TRANSLATE_FALLBACK)
+    return client
 
 def translate_batch(texts, source_lang="ja", target_lang="en"):
     if not texts:
         return []
 
-    print(f"[Translate] Sending {len(texts)} items to Google Translate...")
+    with span("translate.batch", items=len(texts)) as attrs:
+        return _translate_batch(texts, source_lang, target_lang, attrs)
+
+def _translate_batch(texts, source_lang, target_lang, attrs):
+    # Serve what we can from the cache, dedupe the rest by normalized text
+    translations = [None] * len(texts)
+    pending = {}
+    for i, text in enumerate(texts):
+        cached = translation_cache.get(text, source_lang, target_lang)
+        if cached is not None:
+            translations[i] = cached
+        else:
+            pending.setdefault(normalize_text(text), []).append(i)
+
+    attrs["cache_hits"] = len(texts) - sum(len(v) for v in pending.values())
+    attrs["cache_misses"] = len(texts) - attrs["cache_hits"]
+    stats = translation_cache.stats()
+    print(f"[Translate] Cache: {attrs['cache_hits']}/{len(texts)} hits "
+          f"(total {stats['hits']} hits / {stats['misses']} misses)")
+
+    # Near-duplicates of earlier lines (OCR misread a character or two)
+    memory = get_memory()
+    if memory is not None and pending:
+        fuzzy = []
+        for text in list(pending):
+            match = memory.lookup(text, source_lang, target_lang)
+            if match is None:
+                continue
+            for i in pending.pop(text):
+                translations[i] = MemoryTranslation(match[0])
+            fuzzy.append(text)
+        attrs["memory_hits"] = len(fuzzy)
+        if fuzzy:
+            print(f"[Translate] Memory: {len(fuzzy)} near-duplicate lines reused")
+            # Never cached under the new text: a near match can mean the opposite
+            _request_late(active_backend(), fuzzy, source_lang, target_lang)
+
+    if not pending:
+        return translations
+
+    misses = list(pending.keys())
+    backend = active_backend()
+    print(f"[Translate] Sending {len(misses)} items to the {backend} backend...")
     start = time.time()
 
     try:
-        results = translate_client.translate(
-            texts,
-            source_language=source_lang,
-            target_language=target_lang
-        )
+        with span("translate.request", backend=backend, items=len(misses),
+                  chars=sum(len(t) for t in misses)) as request_attrs:
+            results, fallback = _request(backend, misses, source_lang, target_lang)
+            request_attrs["fallback"] = fallback
 
-        translations = [r['translatedText'] for r in results]
+        failed = 0
+        for text, r, from_fallback in zip(misses, results, fallback):
+            # The async client reports chunks that failed after retries as None
+            translation = r['translatedText']
+            if translation is None:
+                failed += 1
+                translation = "[error]"
+            elif from_fallback:
+                translation = FallbackTranslation(translation)
+            else:
+                _remember(text, source_lang, target_lang, translation)
+            for i in pending[text]:
+                translations[i] = translation
+        _save_later()
+        if any(fallback):
+            attrs["fallback"] = sum(fallback)
+        if failed:
+            attrs["failed"] = failed
         print(f"[Translate] Done in {time.time() - start:.2f}s")
         return translations
 
     except Exception as e:
         print(f"[Translate] Error: {e}")
-        return ["[error]"] * len(texts)
+        attrs["error"] = str(e)
+        for indexes in pending.values():
+            for i in indexes:
+                translations[i] = "[error]"
+        return translations
+
+def _remember(text, source_lang, target_lang, translation):
+    translation_cache.put(text, source_lang, target_lang, translation)
+    memory = get_memory()
+    if memory is not None:
+        memory.add(text, source_lang, target_lang, translation)
+
+def _request(backend, texts, source_lang, target_lang):
+    # Returns (results, per-item fallback flags). With a fallback backend
+    # configured, the primary gets TRANSLATE_FALLBACK_TIMEOUT seconds; after
+    # that (or on error, or for items it failed) the fallback answers instead.
+    # Fallback answers aren't cached, and a late primary answer still is, so
+    # the next refresh gets the better translation. If the fallback has no
+    # answer for a line, we keep waiting on the primary as if there were no
+    # fallback rather than show an error.
+    fallback_name = config.TRANSLATE_FALLBACK
+    if not fallback_name or fallback_name == backend:
+        return get_client(backend).translate(texts, source_language=source_lang,
+                                             target_language=target_lang), [False] * len(texts)
+
+    future = _request_executor.submit(get_client(backend).translate, texts,
+                                      source_language=source_lang, target_language=target_lang)
+    timed_out = False
+    try:
+        results = list(future.result(timeout=config.TRANSLATE_FALLBACK_TIMEOUT))
+    except TimeoutError:
+        print(f"[Translate] {backend} slower than {config.TRANSLATE_FALLBACK_TIMEOUT}s, trying {fallback_name}")
+        timed_out = True
+        results = [{"translatedText": None}] * len(texts)
+    except Exception as e:
+        print(f"[Translate] {backend} failed ({e}), using {fallback_name}")
+        results = [{"translatedText": None}] * len(texts)
+
+    missing = [i for i, r in enumerate(results) if r["translatedText"] is None]
+    flags = [False] * len(texts)
+    if missing:
+        local = get_client(fallback_name).translate([texts[i] for i in missing], source_language=source_lang,
+                                                     target_language=target_lang)
+        for i, r in zip(missing, local):
+            if r["translatedText"] is not None:
+                results[i] = r
+                flags[i] = True
+
+    if timed_out and all(flags):
+        _track_late(future, texts, source_lang, target_lang)
+    elif timed_out:
+        print(f"[Translate] {fallback_name} has no answer for {flags.count(False)} items, waiting for {backend}")
+        try:
+            primary = list(future.result())
+        except Exception as e:
+            print(f"[Translate] {backend} failed ({e})")
+        else:
+            for i, r in enumerate(primary):
+                if r["translatedText"] is not None:
+                    results[i] = r
+                    flags[i] = False
+    return results, flags
+
+def _track_late(future, texts, source_lang, target_lang):
+    with _in_flight_lock:
+        _in_flight.update((text, source_lang, target_lang) for text in texts)
+    future.add_done_callback(lambda f: _store_late(f, texts, source_lang, target_lang))
+
+def _request_late(backend, texts, source_lang, target_lang):
+    # Background request whose answers only go to the cache, skipping texts
+    # already on their way
+    with _in_flight_lock:
+        texts = [t for t in texts if (t, source_lang, target_lang) not in _in_flight]
+    if texts:
+        future = _late_executor.submit(get_client(backend).translate, texts,
+                                       source_language=source_lang, target_language=target_lang)
+        _track_late(future, texts, source_lang, target_lang)
+
+def _store_late(future, texts, source_lang, target_lang):
+    with _in_flight_lock:
+        _in_flight.difference_update((text, source_lang, target_lang) for text in texts)
+    try:
+        results = future.result()
+    except Exception:
+        return
+    for text, r in zip(texts, results):
+        if r["translatedText"] is not None:
+            _remember(text, source_lang, target_lang, r["translatedText"])
+    _save_later()
+
+def _save_later():
+    # Queue a save unless one is already waiting; a burst of batches ends up
+    # as one write
+    global _save_queued
+    with _save_lock:
+        if _save_queued:
+            return
+        _save_queued = True
+    _save_executor.submit(_save)
+
+def _save(final=False):
+    # The cache is small and saved every time; the memory file (a few MB at
+    # its size limit) at most every TRANSLATION_MEMORY_SAVE_INTERVAL seconds
+    # and once more on exit
+    global _save_queued, _memory_saved_at
+    with _save_lock:
+        _save_queued = False
+    translation_cache.save()
+    if _memory is not None and (final or time.time() - _memory_saved_at >= config.TRANSLATION_MEMORY_SAVE_INTERVAL):
+        _memory_saved_at = time.time()
+        _memory.save()
+
+atexit.register(_save, True)